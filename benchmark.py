@@ -0,0 +1,335 @@
+'''Microbenchmarks for planner components and planners, no terminal needed
+
+    python benchmark.py run [-o results.json] [--sizes 18x22 36x44] [--quick]
+    python benchmark.py compare baseline.json results.json [--threshold 0.1]
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from objects.Board import Board
+from objects.Mazes import GENERATORS
+from objects.LinearADT import PriorityQueue, PriorityQueue2, IndexedPriorityQueue, BucketQueue
+from objects.PathPlanners import (Dijkstra, AStar, Greedy, DijkstraBD, AStarBD, GreedyBD,
+                                  NBAStar, JPS, LPAStar, HPAStar, BFS, EXPANDED, START)
+
+
+PLANNERS = [Dijkstra, AStar, Greedy, DijkstraBD, AStarBD, GreedyBD, NBAStar, JPS, LPAStar, HPAStar,
+            BFS]
+QUEUES = [PriorityQueue, PriorityQueue2, IndexedPriorityQueue, BucketQueue]
+SIZES = ['18x22', '36x44']
+QUERIES = 3 # Random start/goal pairs per board, besides board.start/goal
+
+
+def measure(fun, repeat):
+    '''Returns (best time in seconds, peak traced memory in bytes) of fun()
+    Memory is traced in a separate run, so it does not slow the timed ones
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fun()
+        best = min(best, time.perf_counter() - t)
+    tracemalloc.start()
+    fun()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def make_board(size, kind, seed):
+    '''Returns board of size 'LxW', empty (kind 'open') or mazified ('maze')'''
+    length, width = map(int, size.split('x'))
+    board = Board(length, width)
+    if kind == 'maze':
+        board.mazify(seed = seed)
+    return board
+
+
+def make_queries(board, seed):
+    '''Returns board's own start/goal pair plus seeded random connected pairs'''
+    rng = random.Random(seed)
+    cells = [(x, y) for y in range(board.l) for x in range(board.w) if board[y][x] != 1]
+    queries = [(board.start, board.goal)]
+    while len(queries) < QUERIES + 1:
+        start, goal = rng.sample(cells, 2)
+        if board.connected(start, goal):
+            queries.append((start, goal))
+    return queries
+
+
+def bench_queues(repeat, seed):
+    '''Times enqueueing then dequeueing a batch of random priorities'''
+    rng = random.Random(seed)
+    priorities = [rng.randrange(2000) for _ in range(20000)]
+    results = {}
+    for queue in QUEUES:
+        def run():
+            pq = queue([], []) if queue is PriorityQueue else queue()
+            for item, priority in enumerate(priorities):
+                pq.enqueue(item, priority)
+            while not pq.isEmpty():
+                pq.dequeue()
+        results['queue/' + queue.__name__] = dict(zip(('time', 'peak'), measure(run, repeat)))
+    return results
+
+
+def bench_board(repeat, seed):
+    '''Times neighbour lookups over every free cell of a maze'''
+    board = make_board('80x100', 'maze', seed)
+    cells = [(x, y) for y in range(board.l) for x in range(board.w) if board[y][x] != 1]
+    ids = [board.index(*cell) for cell in cells]
+
+    def neighbours():
+        for cell in cells:
+            board.getNeighbours(cell)
+
+    def neighbourIds():
+        for i in ids:
+            board.getNeighbourIds(i)
+
+    results = {}
+    for name, run in (('getNeighbours', neighbours), ('getNeighbourIds', neighbourIds)):
+        results['board/' + name] = dict(zip(('time', 'peak'), measure(run, repeat)))
+    return results
+
+
+def bench_mazes(repeat, seed):
+    '''Times every maze generator on one board'''
+    board = Board(200, 200)
+    results = {}
+    for method in GENERATORS:
+        def run():
+            board.mazify(method, seed)
+        results['maze/' + method] = dict(zip(('time', 'peak'), measure(run, repeat)))
+    return results
+
+
+def bench_costs(repeat, seed):
+    '''Times cost and heuristic functions over random cell pairs'''
+    board = make_board('36x44', 'maze', seed)
+    rng = random.Random(seed)
+    cells = [(x, y) for y in range(board.l) for x in range(board.w) if board[y][x] != 1]
+    pairs = [rng.sample(cells, 2) for _ in range(20000)]
+    planner = AStar(board, 0, 0)
+    planner.getLandmarks() # Built once, outside the timed runs
+
+    results = {}
+    for mode in (0, 1):
+        def run():
+            for node1, node2 in pairs:
+                planner.getCost(node1, node2, mode)
+        results['cost/getCost/%d' % mode] = dict(zip(('time', 'peak'), measure(run, repeat)))
+    for mode in (0, 1, 2):
+        def run():
+            for node1, node2 in pairs:
+                planner.getHeuristic(node1, node2, mode)
+        results['cost/getHeuristic/%d' % mode] = dict(zip(('time', 'peak'), measure(run, repeat)))
+    return results
+
+
+def bench_paths(repeat, seed):
+    '''Times path reconstruction from tuple-keyed and direction-code parents'''
+    board = make_board('80x100', 'maze', seed)
+    planner = Dijkstra(board, 0, 0, indexed = True)
+    path = planner.search(board.start, board.goal)
+
+    prevs = {path[0]: None}
+    for k in range(1, len(path)):
+        prevs[path[k]] = path[k-1]
+    codes = bytearray(len(board.grid))
+    codes[board.index(*path[0])] = START
+    for k in range(1, len(path)):
+        step = board.index(*path[k]) - board.index(*path[k-1])
+        codes[board.index(*path[k])] = [offset for _, _, offset in board.nbrOffsets].index(step)
+
+    goal = board.index(*path[-1])
+    results = {}
+    for name, run in (('recreatePath', lambda: planner.recreatePath(prevs, path[-1])),
+                      ('tracePath', lambda: planner.tracePath(codes, goal))):
+        results['path/' + name] = dict(zip(('time', 'peak'), measure(run, repeat)))
+    return results
+
+
+def bench_draw(repeat, seed, sizes):
+    '''Times Board.draw into an off-screen pad, in a child process attached
+    to a pseudo-terminal so curses can start without a real one
+    '''
+    try:
+        import pty
+    except ImportError:
+        return {}
+    import select
+    read_fd, write_fd = os.pipe()
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.environ.update(TERM = 'xterm-256color', LINES = '40', COLUMNS = '120')
+        results = {}
+        try:
+            import curses
+            from objects.Game import Game
+
+            def child(stdscr):
+                Game(Board(18, 22), stdscr) # Sets up colours as the game does
+                for size in sizes:
+                    board = make_board(size, 'maze', seed)
+                    pad = curses.newpad(board.l + 2, board.w * 2 + 4)
+                    path = Dijkstra(board, 0, 0, indexed = True).search(board.start, board.goal)
+
+                    def full():
+                        board.dirtyAll = True
+                        board.draw(pad)
+
+                    def dirty():
+                        for x, y in path:
+                            board[y][x] = 2
+                        board.draw(pad)
+                        board.clearPath()
+                        board.draw(pad)
+
+                    for name, run in (('full', full), ('dirty', dirty)):
+                        results['draw/%s/%s' % (name, size)] = dict(
+                            zip(('time', 'peak'), measure(run, repeat)))
+            curses.wrapper(child)
+        finally:
+            os.write(write_fd, json.dumps(results).encode())
+            os._exit(0)
+
+    # Drain the terminal so the child never blocks on output
+    os.close(write_fd)
+    while True:
+        ready, _, _ = select.select([fd], [], [], 0.1)
+        if ready:
+            try:
+                if not os.read(fd, 65536):
+                    break
+            except OSError:
+                break
+        elif os.waitpid(pid, os.WNOHANG)[0]:
+            pid = None
+            break
+    if pid is not None:
+        os.waitpid(pid, 0)
+    data = b''
+    while True:
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        data += chunk
+    os.close(read_fd)
+    return json.loads(data or b'{}')
+
+
+def bench_planners(repeat, seed, sizes):
+    '''Times every planner x cost mode x heuristic mode on the corpus'''
+    results = {}
+    for size in sizes:
+        for kind in ('open', 'maze'):
+            board = make_board(size, kind, seed)
+            queries = make_queries(board, seed)
+            for planner in PLANNERS:
+                for mode_c in (0, 1):
+                    for mode_h in (0, 1, 2):
+                        search = planner(board, mode_c, mode_h)
+
+                        def run():
+                            for start, goal in queries:
+                                search.search(start, goal)
+
+                        elapsed, peak = measure(run, repeat)
+                        expansions = 0
+                        cost = 0
+                        for start, goal in queries:
+                            for event, data in search.steps(start, goal):
+                                if event == EXPANDED:
+                                    expansions += 1
+                            cost += search.pathCost(search.search(start, goal))
+                        key = 'planner/%s/c%d/h%d/%s/%s' % (planner.__name__, mode_c, mode_h,
+                                                            kind, size)
+                        results[key] = {'time': elapsed, 'peak': peak,
+                                        'expansions': expansions, 'cost': cost}
+                        print(key, '%.4fs' % elapsed, expansions, file = sys.stderr)
+    return results
+
+
+def run(args):
+    '''Runs the whole suite and writes results as JSON'''
+    sizes = args.sizes[:1] if args.quick else args.sizes
+    repeat = 1 if args.quick else args.repeat
+    results = {}
+    for bench in (bench_queues, bench_board, bench_mazes, bench_costs, bench_paths):
+        results.update(bench(repeat, args.seed))
+    results.update(bench_draw(repeat, args.seed, sizes))
+    results.update(bench_planners(repeat, args.seed, sizes))
+
+    report = {'meta': {'seed': args.seed, 'sizes': sizes, 'repeat': repeat,
+                       'python': platform.python_version(), 'platform': platform.platform(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+              'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent = 1, sort_keys = True)
+    print('Wrote %d results to %s' % (len(results), args.output))
+
+
+def compare(args):
+    '''Flags results that got slower, bigger or expanded more than baseline
+    Returns exit status: 1 if anything regressed
+    '''
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+    with open(args.current) as f:
+        current = json.load(f)['results']
+
+    regressions = []
+    for key in sorted(set(baseline) & set(current)):
+        old, new = baseline[key], current[key]
+        for metric, slack in (('time', args.threshold), ('peak', args.threshold),
+                              ('expansions', 0)):
+            if metric in old and metric in new and new[metric] > old[metric] * (1 + slack):
+                regressions.append((key, metric, old[metric], new[metric]))
+
+    for key, metric, old, new in regressions:
+        change = (new / old - 1) * 100 if old else float('inf')
+        print('REGRESSION %s %s: %.6g -> %.6g (%+.1f%%)' % (key, metric, old, new, change))
+    missing = sorted(set(baseline) - set(current))
+    if missing:
+        print('%d baseline results missing, eg. %s' % (len(missing), missing[0]))
+    print('%d results compared, %d regressions' % (len(set(baseline) & set(current)),
+                                                     len(regressions)))
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Planner microbenchmarks')
+    commands = parser.add_subparsers(dest = 'command')
+    commands.required = True
+
+    runner = commands.add_parser('run', help = 'run benchmarks and save JSON')
+    runner.add_argument('-o', '--output', default = 'benchmark.json')
+    runner.add_argument('--sizes', nargs = '+', default = SIZES,
+                        help = 'board sizes as LENGTHxWIDTH (Board constructor units)')
+    runner.add_argument('--repeat', type = int, default = 3, help = 'timed runs; best is kept')
+    runner.add_argument('--seed', type = int, default = 0)
+    runner.add_argument('--quick', action = 'store_true', help = 'smallest size, one run')
+
+    comparer = commands.add_parser('compare', help = 'flag regressions against a baseline')
+    comparer.add_argument('baseline')
+    comparer.add_argument('current')
+    comparer.add_argument('--threshold', type = float, default = 0.1,
+                          help = 'allowed fractional slowdown or memory growth')
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == '__main__':
+    main()
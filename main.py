@@ -1,23 +1,51 @@
+import argparse
 import curses
-from objects.Game import Game
+from objects.Game import Game, MIN_LINES, MIN_COLS
 from objects.Board import Board
+from objects.Mazes import GENERATORS
+from objects.Profiler import Profiler, ENV_VAR
+
+parser = argparse.ArgumentParser(description = 'Path planning visualiser')
+parser.add_argument('--size', default = '18x22', metavar = 'LxW',
+                    help = 'board size as LENGTHxWIDTH (Board constructor units); '
+                           'boards bigger than the terminal scroll')
+parser.add_argument('--maze', choices = sorted(GENERATORS), help = 'start from a generated maze')
+parser.add_argument('--seed', type = int, help = 'seed for --maze')
+parser.add_argument('--load', metavar = 'PATH', help = 'open a saved board file')
+parser.add_argument('--profile', nargs = '?', const = '1', default = None, metavar = 'EXTRAS',
+                    help = 'print search/render/sleep time breakdown on exit; EXTRAS is a '
+                           'comma separated list of cprofile, tracemalloc or all '
+                           '(also set by the {} environment variable)'.format(ENV_VAR))
+args = parser.parse_args()
+profiler = Profiler.fromSpec(args.profile) if args.profile is not None else Profiler.fromEnv()
+
+if args.load:
+    board = Board.load(args.load)
+else:
+    length, width = map(int, args.size.split('x'))
+    board = Board(length, width)
+    if args.maze:
+        board.mazify(args.maze, args.seed)
 
 windowTooSmall = False
 def main(stdscr):
     global windowTooSmall
     h, w = stdscr.getmaxyx()
-    H_LIM, W_LIM = 39, 120
-    if h < H_LIM or w < W_LIM:
+    if h < MIN_LINES or w < MIN_COLS:
         windowTooSmall = True
         curses.endwin()
     else:
-        board = Board(18, 22)
-        game = Game(board, stdscr)
-        game.start()
+        game = Game(board, stdscr, profiler)
+        profiler.start()
+        try:
+            game.start()
+        finally:
+            profiler.stop()
 
 curses.wrapper(main)
 
 #  Dialog after closing
 if windowTooSmall:
-    print('Window must be at least 39 by 120!')
-
+    print('Window must be at least {} by {}!'.format(MIN_LINES, MIN_COLS))
+elif profiler.enabled:
+    print(profiler.report())
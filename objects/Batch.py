@@ -0,0 +1,250 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import Process
+from multiprocessing.shared_memory import SharedMemory
+from objects.PathPlanners import START
+from array import array
+import math
+import os
+
+
+# Planner owned by each worker process, built once from the board snapshot
+_planner = None
+
+
+def init_worker(board, planner, mode_c, mode_h, options):
+    '''Builds the worker's planner over its own copy of the board'''
+    global _planner
+    _planner = planner(board, mode_c, mode_h, **options)
+
+
+def plan_one(query):
+    '''Plans a single (start, goal) query with the worker's planner
+    Returns (path, cost), with ([], inf) if no path exists
+    '''
+    start, goal = query
+    path = list(_planner.search(start, goal))
+    if not path:
+        return path, math.inf
+    return path, _planner.pathCost(path)
+
+
+def plan_many(board, queries, planner, mode_c, mode_h,
+              workers = None, chunksize = None, **options):
+    '''Plans many (start, goal) queries headlessly over a process pool
+    The board itself is never written to; each worker searches its own snapshot
+    board: Board object
+    queries: list of ((x, y), (x, y)) start/goal pairs
+    planner: planner class, eg. AStar
+    mode_c: 0 - Manhattan, 1 - Euclidean
+    mode_h: 0 - Manhattan, 1 - Euclidean, 2 - Landmarks
+    workers: number of processes (defaults to CPU count); 1 runs in-process
+    options: extra planner arguments, eg. queue = IndexedPriorityQueue
+             (indexed = True unless given)
+    Returns list of (path, cost) in query order
+    '''
+    queries = list(queries)
+    options.setdefault('indexed', True)
+
+    # Queries between separate regions are answered here, never sent to workers
+    results = [([], math.inf)] * len(queries)
+    todo = [k for k, (start, goal) in enumerate(queries)
+            if board.connected(start, goal)]
+    if not todo:
+        return results
+    reachable = [queries[k] for k in todo]
+
+    snapshot = board.snapshot()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(reachable)))
+
+    if workers == 1:
+        init_worker(snapshot, planner, mode_c, mode_h, options)
+        paths = [plan_one(query) for query in reachable]
+    else:
+        if chunksize is None:
+            # A few chunks per worker keeps pickling overhead low while balancing load
+            chunksize = max(1, len(reachable) // (workers * 4))
+
+        with ProcessPoolExecutor(max_workers = workers,
+                                 initializer = init_worker,
+                                 initargs = (snapshot, planner, mode_c, mode_h, options)) as pool:
+            paths = list(pool.map(plan_one, reachable, chunksize = chunksize))
+
+    for k, result in zip(todo, paths):
+        results[k] = result
+    return results
+
+
+def shared_views(buf, n):
+    '''Splits the shared block of plan_parallel into views:
+    costs (forward, backward), results, grid, prevs (forward, backward),
+    closed bitmaps (forward, backward) and the stop flag
+    n: number of grid cells
+    Returns list of views, and the list of slices they were cast from
+    '''
+    bits = (n + 7) // 8
+    sizes = (8 * n, 8 * n, 32, n, n, n, bits, bits, 1)
+    slices = []
+    pos = 0
+    for size in sizes:
+        slices.append(buf[pos:pos + size])
+        pos += size
+    views = list(slices)
+    for k in range(3):
+        views[k] = slices[k].cast('d')
+    return views, slices
+
+
+def shared_size(n):
+    '''Returns size in bytes of the shared block for n grid cells'''
+    return 16 * n + 32 + 3 * n + 2 * ((n + 7) // 8) + 1
+
+
+def run_side(planner, shm, n, side, source, target):
+    '''Runs one direction of plan_parallel until it expands a cell the
+    other direction has already expanded, or is told to stop.
+    Each side only ever writes its own costs, parents and closed bits, and
+    only reads the other's, so no locks are needed.
+    side: 0 - forward, 1 - backward
+    source, target: flat indices, with source already labelled
+    '''
+    views, slices = shared_views(shm.buf, n)
+    try:
+        costs_s, costs_g, results, grid, prevs_s, prevs_g, closed_s, closed_g, stop = views
+        if side == 0:
+            costs, prevs, closed = costs_s, prevs_s, closed_s
+            others, otherPrevs, otherClosed = costs_g, prevs_g, closed_g
+            getPriority = planner.getPriority
+        else:
+            costs, prevs, closed = costs_g, prevs_g, closed_g
+            others, otherPrevs, otherClosed = costs_s, prevs_s, closed_s
+            getPriority = planner.getBackwardPriority
+
+        board = planner.board
+        stride = board.stride
+        offsets, steps = planner.getSteps()
+        turnCost = planner.turnCost
+        target_xy = board.coords(target)
+
+        pq = planner.makeQueue()
+        pq.enqueue(source, 0)
+
+        best = math.inf # Cheapest path seen through a cell both sides reached
+        meet = -1
+        while not pq.isEmpty() and not stop[0]:
+            cur = pq.dequeue()
+            byte, bit = cur >> 3, 1 << (cur & 7)
+            if closed[byte] & bit:
+                continue # Stale duplicate
+            closed[byte] |= bit
+            if otherClosed[byte] & bit:
+                # Frontiers have met
+                total = costs[cur] + others[cur]
+                if total < best:
+                    best = total
+                    meet = cur
+                stop[0] = 1
+                break
+
+            cost = costs[cur]
+            prev = prevs[cur]
+            for k in range(4):
+                nbr = cur + offsets[k]
+                if grid[nbr] == 1:
+                    continue
+                cost2nbr = cost + steps[k]
+                if prev != START and (prev ^ k) & 1:
+                    cost2nbr += turnCost
+                if cost2nbr < costs[nbr]:
+                    costs[nbr] = cost2nbr
+                    prevs[nbr] = k
+                    y, x = divmod(nbr, stride)
+                    pq.enqueue(nbr, getPriority(cost2nbr, x-1, y-1, target_xy))
+
+                    other = others[nbr]
+                    if other < math.inf:
+                        total = cost2nbr + other
+                        if otherPrevs[nbr] != START and (otherPrevs[nbr] ^ k) & 1:
+                            total += turnCost
+                        if total < best:
+                            best = total
+                            meet = nbr
+
+        results[2 * side] = best
+        results[2 * side + 1] = meet
+    finally:
+        for view in views + slices:
+            view.release()
+
+
+def plan_parallel(board, start, goal, planner, mode_c, mode_h, **options):
+    '''Plans a single query bidirectionally, with the backward side in a
+    second process, so the two halves run at the same time.
+    Both sides search a shared-memory copy of the grid and publish their
+    expanded cells in shared bitmaps; they stop when one expands a cell the
+    other already has, and the cheaper meeting cell either saw is used.
+    board: Board object
+    start: (x, y) tuple
+    goal: (x, y) tuple
+    planner: planner class, eg. AStarBD; its priority rules are used
+    options: extra planner arguments
+    Returns (path, cost), with ([], inf) if no path exists
+    Raises RuntimeError if the backward process fails
+    '''
+    if not board.connected(start, goal):
+        return [], math.inf
+    if start == goal:
+        return [start], 0
+    search = planner(board, mode_c, mode_h, **options)
+    n = len(board.grid)
+    s = board.index(*start)
+    g = board.index(*goal)
+
+    shm = SharedMemory(create = True, size = shared_size(n))
+    try:
+        views, slices = shared_views(shm.buf, n)
+        views[0][:] = views[1][:] = array('d', [math.inf]) * n
+        views[2][:] = array('d', [math.inf, -1, math.inf, -1]) # No meeting cell yet
+        views[3][:] = board.grid
+        # Both ends are labelled before either side starts, so neither
+        # can miss the other's
+        views[0][s] = views[1][g] = 0
+        views[4][s] = views[5][g] = START
+        for view in views + slices:
+            view.release()
+
+        backward = Process(target = run_side, args = (search, shm, n, 1, g, s))
+        backward.start()
+        try:
+            run_side(search, shm, n, 0, s, g)
+        except BaseException:
+            backward.terminate()
+            raise
+        finally:
+            backward.join()
+        if backward.exitcode != 0:
+            raise RuntimeError('Backward search process exited with code {}'
+                               .format(backward.exitcode))
+
+        views, slices = shared_views(shm.buf, n)
+        results = list(views[2])
+        prevs_s = bytes(views[4])
+        prevs_g = bytes(views[5])
+        for view in views + slices:
+            view.release()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if results[0] <= results[2]:
+        meet = int(results[1])
+    else:
+        meet = int(results[3])
+    if meet < 0:
+        return [], math.inf
+    path = search.tracePath(prevs_s, meet)
+    back = search.tracePath(prevs_g, meet)
+    back.reverse()
+    path += back[1:]
+    return path, search.pathCost(path)
@@ -1,200 +1,400 @@
 # Maze Generation Testing
+import copy
 import curses
 import random
 
+from objects import BoardFile
+from objects.Components import ComponentIndex
+from objects.Mazes import GENERATORS
+
+
+# Translation tables for bulk cell rewrites
+CLEAR_PATH = bytes(1 if v == 1 else 0 for v in range(256))
+TEXT = bytes(ord('#') if v == 1 else ord(' ') for v in range(256))
+
+
+def cell_style(cell):
+    '''Returns (string, attr) used to draw a cell of the given value'''
+    if cell == 0: # Gap
+        return '  ', curses.color_pair(1)
+    elif cell == 1: # Wall
+        return '  ', curses.color_pair(1) | curses.A_BOLD | curses.A_STANDOUT
+    elif cell == 2: # Path
+        return u'\u2805\u2805', curses.color_pair(4) | curses.A_BOLD
+    elif cell == 3: # Visited
+        return u'\u2805'*2, curses.color_pair(5) | curses.A_BOLD
+    elif cell == 4: # Frontier
+        return u'\u2805'*2, curses.color_pair(6) | curses.A_BOLD #| curses.A_STANDOUT
+
+
+class BoardRow:
+    '''View onto one row of the flat grid, so cells read as board[y][x]
+    Writes go through Board.setCell
+    '''
+    __slots__ = ('board', 'base', 'y')
+
+    def __init__(self, board, y):
+        self.board = board
+        self.base = board.index(0, y)
+        self.y = y
+
+    def __getitem__(self, x):
+        return self.board.grid[self.base + x]
+
+    def __setitem__(self, x, value):
+        self.board.setCell(x, self.y, value)
+
+    def __len__(self):
+        return self.board.w
+
 
 class Board:
-    def __init__(self, length, width):
-        '''Constructor'''
+    def __init__(self, length, width, grid = None):
+        '''Constructor
+        grid: flat grid of walls to use instead of an empty board,
+              eg. one loaded from a board file
+        '''
         # Board composed of 2x2 cells
         self.l = (length * 2 - 1) + 2
         self.w = (width * 2 - 1) + 2
-        self.board = [[0 for _ in range(self.w)] for _ in range(self.l)]
+
+        # Flat grid indexed by (y+1)*stride + (x+1), padded with a ring of walls
+        # so neighbour lookups never need bounds checks
+        self.stride = self.w + 2
+        if grid is not None:
+            self.grid = grid
+        else:
+            self.grid = bytearray(b'\x01') * (self.stride * (self.l + 2))
+        # (dx, dy, offset) for S, E, N, W
+        self.nbrOffsets = ((0, 1, self.stride), (1, 0, 1),
+                           (0, -1, -self.stride), (-1, 0, -1))
+
+        # Cells changed since last draw: {y: [min x, max x]}
+        self.dirty = {}
+        self.dirtyAll = True
+
+        # Cells whose walls were added or removed since the board was last
+        # regenerated; layout counts regenerations
+        self.edits = []
+        self.layout = 0
+        self.version = 0 # Bumped on every change to walls, start or goal
+        self.components = None # ComponentIndex, built on first use
+        self.landmarks = None # LandmarkTable, built by the first landmark search
+        self.corridors = None # CorridorGraph, built by the first corridor search
+        self.seed = None # Seed of the last generated maze, if it had one
+        self.mapped = False # True if grid reads straight from a board file
+
         self.start = (3, self.l//2)
         self.goal = (self.w - 4, self.l//2)
         self.cursor = (1, 1)
-        self.generate()
+        if grid is not None:
+            self.newLayout()
+        else:
+            self.generate()
 
     def __str__(self):
         '''Allows Maze object to be printed via print()'''
-        string = ''
+        rows = []
         for y in range(self.l):
-            for x in range(self.w):
-                if self.start == [x, y]:
-                    string += '•'
-                else:
-                    if self.board[y][x] == 1:
-                        string += '#'
-                    else:
-                        string += ' '
-            string += '\n'
-        return string
-
-        
-    def draw(self, screen):
-        '''Draws board and start/goal on curses screen object'''
-        h, w = screen.getmaxyx()
-
-        # Draw walls
+            base = self.index(0, y)
+            rows.append(bytes(self.grid[base:base + self.w]).translate(TEXT).decode())
+        x, y = self.start
+        rows[y] = rows[y][:x] + '•' + rows[y][x + 1:]
+        return '\n'.join(rows) + '\n'
+
+    def save(self, path):
+        '''Saves walls, start, goal and seed to a bit-packed board file'''
+        BoardFile.save(self, path)
+
+    @classmethod
+    def load(cls, path, mapped = False):
+        '''Returns board loaded from a board file through a memory map
+        mapped: if True, the board reads its walls straight from the
+                mapping, which opens instantly and pages in lazily, but is
+                read-only: planners can search it, the game cannot edit it
+        '''
+        header, data = BoardFile.read(path)
+        n = (header['w'] + 2) * (header['l'] + 2)
+        if mapped:
+            grid = BoardFile.PackedGrid(data, n)
+        else:
+            grid = BoardFile.unpacked(data, n)
+            data.close()
+        board = cls(header['l'] // 2, header['w'] // 2, grid)
+        board.start = header['start']
+        board.goal = header['goal']
+        board.seed = header['seed']
+        board.mapped = mapped
+        return board
+
+    def draw(self, screen, view = None):
+        '''Draws changed parts of board and start/goal on curses screen object
+        Each dirty row span is drawn as a few runs of same-valued cells
+        view: Viewport whose pad region is drawn into its pad, with
+              everything outside the region skipped; if None, the whole
+              board is drawn at a fixed offset on screen
+        '''
+        top, left, bottom, right = self.region(view)
+        if self.dirtyAll:
+            spans = {j: (left, right - 1) for j in range(top, bottom)}
+        else:
+            spans = self.dirty
+        styles = {}
+
         # Double horizontal spacing for better aspect ratio
-        for i in range(self.w):
-            for j in range(self.l):
-                if self.board[j][i] == 0: # Gap
-                    string = '  '
-                    attr = curses.color_pair(1)
-                elif self.board[j][i] == 1: # Wall
-                    string = '  '
-                    attr = curses.color_pair(1) | curses.A_BOLD | curses.A_STANDOUT
-                elif self.board[j][i] == 2: # Path
-                    string = u'\u2805\u2805'
-                    attr = curses.color_pair(4) | curses.A_BOLD
-                elif self.board[j][i] == 3: # Visited
-                    string = u'\u2805'*2 
-                    attr = curses.color_pair(5) | curses.A_BOLD
-                elif self.board[j][i] == 4: # Frontier
-                    string = u'\u2805'*2 
-                    attr = curses.color_pair(6) | curses.A_BOLD #| curses.A_STANDOUT
-
-                screen.addstr(1 + j, 2 + i * 2, string, attr)
-
-        self.draw_start(screen)
-        self.draw_goal(screen)
-
-    def draw_cell(self, i, j, screen):
-        if self.board[j][i] == 0: # Gap
-            string = '  '
-            attr = curses.color_pair(1)
-        elif self.board[j][i] == 1: # Wall
-            string = '  '
-            attr = curses.color_pair(1) | curses.A_BOLD | curses.A_STANDOUT
-        elif self.board[j][i] == 2: # Path
-            string = u'\u2805\u2805'
-            attr = curses.color_pair(4) | curses.A_BOLD
-        elif self.board[j][i] == 3: # Visited
-            string = u'\u2805'*2 
-            attr = curses.color_pair(5) | curses.A_BOLD
-        elif self.board[j][i] == 4: # Frontier
-            string = u'\u2805'*2 
-            attr = curses.color_pair(6) | curses.A_BOLD #| curses.A_STANDOUT
-
-        screen.addstr(1 + j, 2 + i * 2, string, attr)
-
-    def draw_start(self, screen):
-        screen.addstr(1 + self.start[1],
-                      2 + self.start[0]*2,
-                      '  ', curses.color_pair(2))
-
-    def draw_goal(self, screen):
-        screen.addstr(1 + self.goal[1],
-                      2 + self.goal[0]*2,
-                      '  ', curses.color_pair(3) | curses.A_BOLD)
-
-    def draw_cursor(self, screen):
+        grid = self.grid
+        for j, (lo, hi) in spans.items():
+            if not top <= j < bottom:
+                continue
+            lo = max(lo, left)
+            hi = min(hi, right - 1)
+            y, x = self.place(0, j, view)
+            base = self.index(0, j)
+            i = lo
+            while i <= hi:
+                cell = grid[base + i]
+                k = i + 1
+                while k <= hi and grid[base + k] == cell:
+                    k += 1
+                if cell not in styles:
+                    styles[cell] = cell_style(cell)
+                string, attr = styles[cell]
+                screen.addstr(y, x + i * 2, string * (k - i), attr)
+                i = k
+
+        self.dirty = {}
+        self.dirtyAll = False
+        self.draw_start(screen, view)
+        self.draw_goal(screen, view)
+
+    def region(self, view):
+        '''Returns (top, left, bottom, right) bounds of cells drawn for view'''
+        if view is None:
+            return 0, 0, self.l, self.w
+        return view.top, view.left, view.top + view.rows, view.left + view.cols
+
+    def place(self, i, j, view):
+        '''Returns (y, x) screen position of cell (i, j) drawn for view'''
+        if view is None:
+            return 1 + j, 2 + i * 2
+        return j - view.top, (i - view.left) * 2
+
+    def visible(self, i, j, view):
+        '''Returns True if cell (i, j) is drawn for view'''
+        top, left, bottom, right = self.region(view)
+        return top <= j < bottom and left <= i < right
+
+    def draw_cell(self, i, j, screen, view = None):
+        if self.visible(i, j, view):
+            string, attr = cell_style(self.grid[self.index(i, j)])
+            screen.addstr(*self.place(i, j, view), string, attr)
+
+    def markDirty(self, x, y):
+        '''Marks cell (x, y) to be redrawn by the next draw'''
+        span = self.dirty.get(y)
+        if span is None:
+            self.dirty[y] = [x, x]
+        elif x < span[0]:
+            span[0] = x
+        elif x > span[1]:
+            span[1] = x
+
+    def draw_start(self, screen, view = None):
+        if self.visible(*self.start, view):
+            screen.addstr(*self.place(*self.start, view), '  ', curses.color_pair(2))
+
+    def draw_goal(self, screen, view = None):
+        if self.visible(*self.goal, view):
+            screen.addstr(*self.place(*self.goal, view),
+                          '  ', curses.color_pair(3) | curses.A_BOLD)
+
+    def draw_cursor(self, screen, view = None):
+        '''Draws cursor over its cell, and marks the cell dirty so the next
+        draw repaints it, whether or not the cursor is drawn again
+        '''
         i, j = self.cursor
         if self.cursor == self.start:
             attr = curses.color_pair(2)
         elif self.cursor == self.goal:
             attr = curses.color_pair(3) | curses.A_BOLD
-        elif self.board[j][i] == 1:
+        elif self.grid[self.index(i, j)] == 1:
             attr = curses.color_pair(1) | curses.A_BOLD | curses.A_STANDOUT
         else:
             attr = curses.color_pair(0)
 
-        screen.addstr(1 + self.cursor[1],
-                      2 + self.cursor[0]*2,
-                      u'\u283f\u283f', attr)
+        if self.visible(i, j, view):
+            screen.addstr(*self.place(i, j, view), u'\u283f\u283f', attr)
+        self.markDirty(i, j)
 
     def clearPath(self):
         '''Removes path nodes from board'''
-        for i in range(self.w):
-            for j in range(self.l):
-                if self.board[j][i] != 1:
-                    self.board[j][i] = 0
+        cleared = self.grid.translate(CLEAR_PATH)
+        if cleared == self.grid:
+            return
+        # Only rows that held path nodes need redrawing
+        for j in range(self.l):
+            base = self.index(0, j)
+            if cleared[base:base + self.w] != self.grid[base:base + self.w]:
+                self.dirty[j] = [0, self.w - 1]
+        self.grid[:] = cleared
 
     def generate(self):
         '''Generates an empty board with border walls'''
-        self.board = [[1 for _ in range(self.w)] for _ in range(self.l)]
-        for i in range(1, self.w-1):
-            for j in range(1, self.l-1):
-                self.board[j][i] = 0
-
-    def mazify(self):
-        '''Generates random maze using DFS and moves player to start'''
-        self.board = [[1 for _ in range(self.w)] for _ in range(self.l)]
-        x, y = random.randrange(1,self.w - 1,2), random.randrange(1,self.l - 1,2)
-        self.board[y][x] = 0
-        self.carve(x, y)
+        self.grid[:] = b'\x01' * len(self.grid)
+        gap = bytes(self.w - 2)
+        for j in range(1, self.l-1):
+            i = self.index(1, j)
+            self.grid[i:i + self.w - 2] = gap
+        self.newLayout()
+
+    def mazify(self, method = 'backtracker', seed = None):
+        '''Generates random maze and opens the cells under start and goal
+        method: name of a generator in Mazes.GENERATORS
+        seed: seed for a private random generator, or None to use the
+              random module's shared state
+        '''
+        rng = random.Random(seed) if seed is not None else random
+        self.grid[:] = b'\x01' * len(self.grid)
+        GENERATORS[method](self, rng)
+        self.seed = seed
 
         # Delete walls directly above start and goal
-        start_x, start_y = self.start
-        goal_x, goal_y = self.goal
-        self.board[start_y][start_x] = 0
-        self.board[goal_y][goal_x] = 0
-
-    def carve(self, x, y):
-        '''Helper recursive function for DFS maze generation.
-        "Carves" a tunnel from position (x, y).
+        self.grid[self.index(*self.start)] = 0
+        self.grid[self.index(*self.goal)] = 0
+        self.newLayout()
+
+    def newLayout(self):
+        '''Records that the whole board was rewritten'''
+        self.layout += 1
+        self.version += 1
+        self.edits = []
+        self.components = None
+        self.dirtyAll = True
+
+    def setCell(self, x, y, value):
+        '''Sets cell (x, y) to value, logging the edit if a wall was added
+        or removed
         '''
-        DIRS = [(0, -2), (2, 0), (0, 2), (-2, 0)] # N, E, S, W
-        random.shuffle(DIRS)
-        for dx, dy in DIRS:
-            if self.inBoard(x+dx, y+dy) and self.board[y+dy][x+dx] == 1:
-                # Open wall between (x, y) and (x+dx, y+dy)
-                for i in range(min(x, x+dx), max(x, x+dx)+1):
-                    for j in range(min(y, y+dy), max(y, y+dy)+1):
-                        self.board[j][i] = 0
-                self.carve(x+dx, y+dy)
+        i = self.index(x, y)
+        if (self.grid[i] == 1) != (value == 1):
+            self.edits.append((x, y))
+            self.version += 1
+            self.grid[i] = value
+            if self.components is not None:
+                self.components.setWall(i, value == 1)
+        else:
+            self.grid[i] = value
+        self.markDirty(x, y)
+
+    def connected(self, node1, node2):
+        '''Returns True if a path exists between free cells node1 and node2
+        node1: (x, y) tuple
+        node2: (x, y) tuple
+        '''
+        if self.mapped:
+            # Labelling would read every page of the file; a search that
+            # cannot reach its goal stops once its own component is exhausted
+            return True
+        if self.components is None:
+            self.components = ComponentIndex(self)
+        return self.components.connected(self.index(*node1), self.index(*node2))
+
+    def editMark(self):
+        '''Returns a marker for the current wall state, for editsSince'''
+        return (self.layout, len(self.edits))
+
+    def editsSince(self, mark):
+        '''Returns list of (x, y) cells whose walls changed since mark,
+        or None if the board has been regenerated since
+        '''
+        layout, n = mark
+        if layout != self.layout:
+            return None
+        return self.edits[n:]
 
     def inBoard(self, x, y):
         '''Helper function that returns TRUE if (x, y) is valid.'''
         return (0 <= x < self.w) and (0 <= y < self.l)
 
+    def index(self, x, y):
+        '''Returns flat grid index of (x, y)'''
+        return (y + 1) * self.stride + x + 1
+
+    def coords(self, i):
+        '''Returns (x, y) of flat grid index i'''
+        y, x = divmod(i, self.stride)
+        return (x - 1, y - 1)
+
     def getNeighbours(self, node):
         '''Gets neighbouring free nodes within the board
         node: (x, y) tuple
         '''
         x, y = node
-        dirs = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-        nbrs = []
-        for dx, dy in dirs:
-            if self.inBoard(x+dx, y+dy) and self.board[y+dy][x+dx] != 1:
-                nbrs.append((x+dx, y+dy))
-        return nbrs
+        i = (y + 1) * self.stride + x + 1
+        grid = self.grid
+        return [(x + dx, y + dy) for dx, dy, offset in self.nbrOffsets
+                if grid[i + offset] != 1]
+
+    def getNeighbourIds(self, i):
+        '''Gets flat indices of neighbouring free cells of flat index i'''
+        grid = self.grid
+        return [i + offset for _, _, offset in self.nbrOffsets
+                if grid[i + offset] != 1]
+
+    def snapshot(self):
+        '''Returns a copy of the board holding only walls, start and goal.
+        Searches run on the copy leave the display state untouched
+        '''
+        snap = copy.copy(self)
+        snap.grid = self.grid.translate(CLEAR_PATH)
+        snap.dirty = {}
+        snap.edits = list(self.edits)
+        if self.components is not None:
+            snap.components = self.components.copy(snap)
+        if self.landmarks is not None:
+            snap.landmarks = self.landmarks.copy(snap)
+        if self.corridors is not None:
+            snap.corridors = self.corridors.copy(snap)
+        return snap
 
     def __getitem__(self, i):
-        return self.board[i]
+        return BoardRow(self, i)
 
     def __len__(self):
-        return len(self.board)
+        return self.l
 
     def placeStart(self, pos):
         '''Places start at pos = (x, y)'''
         new_x, new_y = pos
         if self.inBoard(new_x, new_y):
+            self.markDirty(*self.start)
             self.start = (new_x, new_y)
-            self.board[new_y][new_x] = 0
+            self.setCell(new_x, new_y, 0)
+            self.version += 1
 
     def moveStart(self, direction):
         '''Moves start node'''
         dirs = {'U': [-1, 0], 'D': [1, 0], 'L': [0, -1], 'R': [0, 1]}
         dy, dx = dirs[direction]
         x, y = self.start
-        if self.board[y+dy][x+dx] != 1:
+        if self.grid[self.index(x+dx, y+dy)] != 1:
             self.placeStart((x+dx, y+dy))
 
     def placeGoal(self, pos):
         '''Places goal at pos = (x, y)'''
         new_x, new_y = pos
         if self.inBoard(new_x, new_y):
+            self.markDirty(*self.goal)
             self.goal = (new_x, new_y)
-            self.board[new_y][new_x] = 0
+            self.setCell(new_x, new_y, 0)
+            self.version += 1
 
     def moveGoal(self, direction):
         '''Moves goal node'''
         dirs = {'U': [-1, 0], 'D': [1, 0], 'L': [0, -1], 'R': [0, 1]}
         dy, dx = dirs[direction]
         x, y = self.goal
-        if self.board[y+dy][x+dx] != 1:
+        if self.grid[self.index(x+dx, y+dy)] != 1:
             self.placeGoal((x+dx, y+dy))
 
     def moveCursor(self, direction):
@@ -0,0 +1,124 @@
+'''Bit-packed board files
+
+A file is a fixed header followed by one bit per cell of the board's flat
+padded grid, least significant bit first, set for walls. Packing the padded
+grid rather than just the board keeps flat indices identical on disk and in
+memory, so a mapped file can be searched without translating indices.
+'''
+import mmap
+import struct
+
+MAGIC = b'PPBD'
+VERSION = 1
+# Magic, version, board length and width, start x and y, goal x and y, seed
+HEADER = struct.Struct('<4sHxxIIIIIIq')
+NO_SEED = -1
+CHUNK = 1 << 20 # Cells packed or unpacked at a time; a multiple of 8
+
+WALLS = bytes(1 if v == 1 else 0 for v in range(256))
+
+
+def pack(cells):
+    '''Returns bytes holding one bit per cell of cells, a bytes-like of
+    0s and 1s whose length is a multiple of 8
+    Each bit position is gathered as a big integer of 0/1 bytes and
+    shifted into place, so the work is done in C rather than per cell
+    '''
+    n = len(cells) // 8
+    packed = 0
+    for k in range(8):
+        packed |= int.from_bytes(cells[k::8], 'little') << k
+    return packed.to_bytes(n, 'little')
+
+
+def unpack(data, out):
+    '''Writes one 0/1 byte per bit of data into bytearray out, which is
+    8 times as long as data
+    '''
+    packed = int.from_bytes(data, 'little')
+    mask = int.from_bytes(b'\x01' * len(data), 'little')
+    for k in range(8):
+        out[k::8] = ((packed >> k) & mask).to_bytes(len(data), 'little')
+
+
+def save(board, path):
+    '''Writes walls, start, goal and seed of board to path, packing the
+    grid a chunk at a time so memory use does not grow with the board
+    '''
+    grid = board.grid
+    seed = board.seed if board.seed is not None else NO_SEED
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, board.l, board.w, *board.start, *board.goal, seed))
+        for i in range(0, len(grid), CHUNK):
+            cells = bytes(grid[i:i + CHUNK]).translate(WALLS)
+            if len(cells) % 8:
+                cells += b'\x01' * (8 - len(cells) % 8) # Trailing bits are walls
+            f.write(pack(cells))
+
+
+def read(path):
+    '''Returns (header fields, mapping) of the board file at path, with
+    the mapping opened read-only; pages are read from disk as accessed
+    '''
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+    if len(data) < HEADER.size:
+        raise ValueError('{} is not a board file'.format(path))
+    magic, version, l, w, sx, sy, gx, gy, seed = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('{} is not a board file'.format(path))
+    if version != VERSION:
+        raise ValueError('{} has unsupported board file version {}'.format(path, version))
+    cells = (w + 2) * (l + 2)
+    if len(data) != HEADER.size + (cells + 7) // 8:
+        raise ValueError('{} is truncated'.format(path))
+    header = {'l': l, 'w': w, 'start': (sx, sy), 'goal': (gx, gy),
+              'seed': seed if seed != NO_SEED else None}
+    return header, data
+
+
+def unpacked(data, n):
+    '''Returns bytearray grid of n cells unpacked from mapping data'''
+    grid = bytearray((n + 7) & ~7)
+    with memoryview(data) as bits, memoryview(grid) as cells:
+        bits = bits[HEADER.size:]
+        for i in range(0, len(grid), CHUNK):
+            unpack(bits[i // 8:(i + CHUNK) // 8], cells[i:i + CHUNK])
+        bits.release()
+    del grid[n:]
+    return grid
+
+
+class PackedGrid:
+    '''Read-only flat grid over the bits of a mapped board file
+    Indexing gives 1 for walls and 0 for free cells like a board's
+    bytearray, so planners search it as is; only the pages a search
+    touches are ever read
+    '''
+    __slots__ = ('data', 'bits', 'n')
+
+    def __init__(self, data, n):
+        self.data = data # Kept so the mapping outlives the view
+        self.bits = memoryview(data)[HEADER.size:]
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self.n)
+            if step != 1:
+                return bytes(self)[i]
+            lo = start & ~7
+            out = bytearray((stop - lo + 7) & ~7)
+            unpack(self.bits[lo // 8:lo // 8 + len(out) // 8], out)
+            return bytes(out[start - lo:stop - lo])
+        return (self.bits[i >> 3] >> (i & 7)) & 1
+
+    def __bytes__(self):
+        return bytes(self[0:self.n])
+
+    def translate(self, table):
+        '''Returns unpacked copy of the grid, translated like bytearray.translate'''
+        return bytearray(self[0:self.n]).translate(table)
@@ -0,0 +1,228 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+
+# Grid owned by each preprocessing worker process
+_grid = None
+_stride = None
+
+
+def init_worker(grid, stride):
+    '''Gives the worker its own copy of the board's flat grid'''
+    global _grid, _stride
+    _grid = grid
+    _stride = stride
+
+
+def cluster_edges(job):
+    '''Finds step distances between every pair of entrances of one cluster
+    job: (cluster, bounds, entrances)
+    Returns (cluster, {entrance: [(entrance, cost), ...]})
+    '''
+    cluster, bounds, entrances = job
+    edges = {}
+    for e in entrances:
+        costs, _ = bfs(_grid, _stride, bounds, e)
+        edges[e] = [(o, costs[o]) for o in entrances if o != e and o in costs]
+    return cluster, edges
+
+
+def bfs(grid, stride, bounds, source, target = None):
+    '''Breadth-first search from flat index source, never leaving bounds
+    bounds: (x0, y0, x1, y1) in padded grid coordinates, end-exclusive
+    target: flat index to stop at, if any
+    Returns (costs, prevs) dicts keyed by flat index
+    '''
+    x0, y0, x1, y1 = bounds
+    offsets = (stride, 1, -stride, -1)
+    costs = {source: 0}
+    prevs = {source: None}
+    frontier = [source]
+    cost = 0
+    while frontier and target not in costs:
+        cost += 1
+        layer = []
+        for cur in frontier:
+            for offset in offsets:
+                nbr = cur + offset
+                if grid[nbr] == 1 or nbr in costs:
+                    continue
+                y, x = divmod(nbr, stride)
+                if x0 <= x < x1 and y0 <= y < y1:
+                    costs[nbr] = cost
+                    prevs[nbr] = cur
+                    layer.append(nbr)
+        frontier = layer
+    return costs, prevs
+
+
+class ClusterGraph:
+    def __init__(self, board, size = 16, workers = 1):
+        '''Abstract graph for hierarchical search over board.
+        The board is cut into size x size clusters. Free cells facing each
+        other across a cluster border form entrances, which are joined by
+        unit edges across the border and by precomputed step distances
+        within each cluster.
+        board: Board object
+        size: cluster width and height in cells
+        workers: processes used for a full rebuild; 1 runs in-process
+        '''
+        self.board = board
+        self.size = size
+        self.workers = workers
+        self.mark = None
+
+    def refresh(self):
+        '''Brings the graph up to date with the board's walls'''
+        edits = self.board.editsSince(self.mark) if self.mark is not None else None
+        if edits is None:
+            self.build()
+        elif edits:
+            self.update(edits)
+        self.mark = self.board.editMark()
+
+    def build(self):
+        '''Finds every entrance and preprocesses every cluster'''
+        board = self.board
+        self.nx = (board.w + self.size - 1) // self.size
+        self.ny = (board.l + self.size - 1) // self.size
+        self.borders = {} # (cluster, east/south cluster): [(cell, cell), ...]
+        self.cross = {} # Entrance: entrances across a border
+        self.intra = {} # Cluster: {entrance: [(entrance, cost), ...]}
+        for cy in range(self.ny):
+            for cx in range(self.nx):
+                for other in ((cx + 1, cy), (cx, cy + 1)):
+                    if other[0] < self.nx and other[1] < self.ny:
+                        self.setBorder((cx, cy), other)
+        clusters = [(cx, cy) for cy in range(self.ny) for cx in range(self.nx)]
+        self.preprocess(clusters, self.workers)
+
+    def update(self, cells):
+        '''Redoes only the clusters touched by wall edits
+        A cell on a cluster's edge also changes the entrances on that border,
+        so the cluster across it is redone too
+        cells: list of (x, y) tuples
+        '''
+        size = self.size
+        dirty = set()
+        borders = set()
+        for x, y in cells:
+            cluster = (x // size, y // size)
+            dirty.add(cluster)
+            for dx, dy in ((1, 0), (0, 1), (-1, 0), (0, -1)):
+                other = ((x + dx) // size, (y + dy) // size)
+                if other != cluster and 0 <= other[0] < self.nx and 0 <= other[1] < self.ny:
+                    dirty.add(other)
+                    borders.add(tuple(sorted((cluster, other)))) # West/north first
+        for c1, c2 in borders:
+            self.setBorder(c1, c2)
+        self.preprocess(sorted(dirty), 1)
+
+    def setBorder(self, c1, c2):
+        '''Recomputes entrances between cluster c1 and its east/south neighbour c2
+        Each run of open cell pairs gets an entrance in its middle,
+        or one at each end if the run is long
+        '''
+        board = self.board
+        grid = board.grid
+        size = self.size
+        if c1[1] == c2[1]: # c2 east of c1
+            x = c2[0] * size
+            pairs = [(board.index(x - 1, y), board.index(x, y))
+                     for y in range(c1[1] * size, min((c1[1] + 1) * size, board.l))]
+        else: # c2 south of c1
+            y = c2[1] * size
+            pairs = [(board.index(x, y - 1), board.index(x, y))
+                     for x in range(c1[0] * size, min((c1[0] + 1) * size, board.w))]
+
+        for a, b in self.borders.get((c1, c2), []):
+            self.cross[a].remove(b)
+            self.cross[b].remove(a)
+
+        transitions = []
+        run = []
+        for a, b in pairs + [(None, None)]:
+            if a is not None and grid[a] != 1 and grid[b] != 1:
+                run.append((a, b))
+                continue
+            if len(run) >= 6:
+                transitions += [run[0], run[-1]]
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+
+        self.borders[(c1, c2)] = transitions
+        for a, b in transitions:
+            self.cross.setdefault(a, []).append(b)
+            self.cross.setdefault(b, []).append(a)
+
+    def entrances(self, cluster):
+        '''Returns sorted list of entrance cells of cluster'''
+        cx, cy = cluster
+        cells = set()
+        for other in ((cx + 1, cy), (cx, cy + 1)):
+            cells.update(a for a, _ in self.borders.get((cluster, other), []))
+        for other in ((cx - 1, cy), (cx, cy - 1)):
+            cells.update(b for _, b in self.borders.get((other, cluster), []))
+        return sorted(cells)
+
+    def preprocess(self, clusters, workers):
+        '''Computes intra-cluster entrance distances, over a process pool
+        when there are enough clusters to share out
+        '''
+        board = self.board
+        jobs = [(c, self.bounds(c), self.entrances(c)) for c in clusters]
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers > 1 and len(jobs) > workers:
+            chunksize = max(1, len(jobs) // (workers * 4))
+            with ProcessPoolExecutor(max_workers = workers,
+                                     initializer = init_worker,
+                                     initargs = (bytes(board.grid), board.stride)) as pool:
+                results = list(pool.map(cluster_edges, jobs, chunksize = chunksize))
+        else:
+            init_worker(board.grid, board.stride)
+            results = [cluster_edges(job) for job in jobs]
+        for cluster, edges in results:
+            self.intra[cluster] = edges
+
+    def bounds(self, cluster):
+        '''Returns padded-grid bounds (x0, y0, x1, y1) of cluster for bfs'''
+        cx, cy = cluster
+        size = self.size
+        return (cx * size + 1, cy * size + 1,
+                min((cx + 1) * size, self.board.w) + 1,
+                min((cy + 1) * size, self.board.l) + 1)
+
+    def clusterOf(self, i):
+        '''Returns cluster holding flat index i'''
+        y, x = divmod(i, self.board.stride)
+        return ((x - 1) // self.size, (y - 1) // self.size)
+
+    def neighbours(self, i):
+        '''Returns [(node, cost), ...] abstract edges of entrance i'''
+        edges = self.intra[self.clusterOf(i)].get(i, [])
+        return edges + [(j, 1) for j in self.cross.get(i, [])]
+
+    def connect(self, i):
+        '''Returns step distances from flat index i to the entrances
+        of its cluster, as {entrance: cost}, plus the bfs costs and parents
+        '''
+        cluster = self.clusterOf(i)
+        costs, prevs = bfs(self.board.grid, self.board.stride, self.bounds(cluster), i)
+        edges = {e: costs[e] for e in self.entrances(cluster) if e in costs and e != i}
+        return edges, costs
+
+    def refine(self, i, j):
+        '''Returns flat indices of a shortest path from i to j,
+        which are in the same cluster or face each other across a border
+        '''
+        cluster = self.clusterOf(i)
+        if cluster != self.clusterOf(j):
+            return [i, j]
+        _, prevs = bfs(self.board.grid, self.board.stride, self.bounds(cluster), i, j)
+        path = [j]
+        while prevs[path[-1]] is not None:
+            path.append(prevs[path[-1]])
+        path.reverse()
+        return path
@@ -0,0 +1,157 @@
+from array import array
+
+
+class ComponentIndex:
+    def __init__(self, board):
+        '''Labels the connected regions of free cells of a board, so whether
+        two cells are reachable from each other is a constant-time lookup.
+        Labels are merged with union-find when walls are removed; a new wall
+        only relabels the region it actually cuts off.
+        board: Board object
+        '''
+        self.board = board
+        self.build()
+
+    def build(self):
+        '''Labels every region of the board from scratch'''
+        board = self.board
+        grid = board.grid
+        self.labels = array('i', [-1]) * len(grid) # Cell label, -1 for walls
+        self.parents = [] # Union-find over labels
+        for i in range(len(grid)):
+            if grid[i] != 1 and self.labels[i] < 0:
+                self.fill([i], self.newLabel())
+
+    def copy(self, board):
+        '''Returns a copy of the index for a copy of its board'''
+        index = ComponentIndex.__new__(ComponentIndex)
+        index.board = board
+        index.labels = array('i', self.labels)
+        index.parents = list(self.parents)
+        return index
+
+    def newLabel(self):
+        '''Returns an unused label'''
+        label = len(self.parents)
+        self.parents.append(label)
+        return label
+
+    def find(self, label):
+        '''Returns representative label of label's region'''
+        parents = self.parents
+        while parents[label] != label:
+            parents[label] = parents[parents[label]] # Path halving
+            label = parents[label]
+        return label
+
+    def fill(self, cells, label):
+        '''Labels cells and every free cell reachable from them'''
+        grid = self.board.grid
+        labels = self.labels
+        offsets = [offset for _, _, offset in self.board.nbrOffsets]
+        for i in cells:
+            labels[i] = label
+        stack = list(cells)
+        while stack:
+            i = stack.pop()
+            for offset in offsets:
+                j = i + offset
+                if grid[j] != 1 and labels[j] != label:
+                    labels[j] = label
+                    stack.append(j)
+
+    def connected(self, i, j):
+        '''Returns True if flat indices i and j are free and in the same region'''
+        a = self.labels[i]
+        b = self.labels[j]
+        if a < 0 or b < 0:
+            return False
+        return a == b or self.find(a) == self.find(b)
+
+    def setWall(self, i, wall):
+        '''Updates labels after the cell at flat index i became a wall
+        (wall = True) or a gap (wall = False)
+        '''
+        if wall:
+            self.addWall(i)
+        else:
+            self.removeWall(i)
+
+    def removeWall(self, i):
+        '''Joins the new gap at flat index i with its neighbours' regions'''
+        labels = self.labels
+        roots = {self.find(labels[i + offset]) for _, _, offset in self.board.nbrOffsets
+                 if labels[i + offset] >= 0}
+        if not roots:
+            labels[i] = self.newLabel()
+            return
+        root = roots.pop()
+        for other in roots:
+            self.parents[other] = root
+        labels[i] = root
+
+    def addWall(self, i):
+        '''Splits the region of the new wall at flat index i if it was cut.
+        Grows a search from each free neighbour in turn; searches that meet
+        merge, and the first ones to run out of cells are closed-off pieces.
+        Only those pieces are relabelled, so the cost is bounded by the size
+        of the smaller side of the cut (or by how soon the searches meet).
+        '''
+        grid = self.board.grid
+        labels = self.labels
+        labels[i] = -1
+        offsets = [offset for _, _, offset in self.board.nbrOffsets]
+        starts = [i + offset for offset in offsets if grid[i + offset] != 1]
+        if len(starts) < 2:
+            return
+
+        owner = {s: k for k, s in enumerate(starts)}
+        groups = list(range(len(starts))) # Union-find over searches
+        stacks = [[s] for s in starts]
+
+        def group(k):
+            while groups[k] != k:
+                k = groups[k]
+            return k
+
+        active = set(range(len(starts))) # Searches with cells left to expand
+        while True:
+            roots = {group(k) for k in range(len(starts))}
+            open_roots = {group(k) for k in active}
+            if len(roots) == 1 or len(open_roots) <= 1:
+                break
+            for k in list(active):
+                stack = stacks[k]
+                if not stack:
+                    active.discard(k)
+                    continue
+                u = stack.pop()
+                for offset in offsets:
+                    v = u + offset
+                    if grid[v] == 1:
+                        continue
+                    other = owner.get(v)
+                    if other is None:
+                        owner[v] = k
+                        stack.append(v)
+                    else:
+                        a, b = group(k), group(other)
+                        if a != b:
+                            groups[b] = a
+                if not stack:
+                    active.discard(k)
+
+        # Pieces whose searches all ran dry are whole regions of their own
+        open_roots = {group(k) for k in active}
+        closed = {}
+        for v, k in owner.items():
+            root = group(k)
+            if root not in open_roots:
+                closed.setdefault(root, []).append(v)
+        if len(closed) == len({group(k) for k in range(len(starts))}):
+            # Every piece finished; the last one can keep the old label
+            closed.popitem()
+        for cells in closed.values():
+            label = self.newLabel()
+            for v in cells:
+                labels[v] = label
@@ -0,0 +1,106 @@
+class CorridorGraph:
+    def __init__(self, board):
+        '''Junction graph of board, with every corridor (chain of free cells
+        with exactly two free neighbours) collapsed into one edge.
+        Nodes are junctions and dead ends; each edge records its first and
+        last step directions, its length and the turns along it, so callers
+        can add their own step and turn costs.
+        The graph rebuilds itself on the next search after walls change.
+        board: Board object
+        '''
+        self.board = board
+        self.mark = None
+        self.junction = None
+        self.edges = None
+
+    def copy(self, board):
+        '''Returns a copy of the graph for a copy of its board'''
+        graph = CorridorGraph(board)
+        graph.mark = self.mark
+        graph.junction = self.junction # Never modified in place, so safe to share
+        graph.edges = self.edges
+        return graph
+
+    def refresh(self):
+        '''Rebuilds the graph if the board's walls have changed since'''
+        if self.mark != self.board.editMark():
+            self.build()
+
+    def build(self):
+        '''Finds junctions, then walks each corridor leaving them'''
+        board = self.board
+        grid = board.grid
+        offsets = [offset for _, _, offset in board.nbrOffsets]
+
+        junction = bytearray(len(grid))
+        nodes = []
+        for i in range(len(grid)):
+            if grid[i] != 1:
+                degree = 0
+                for offset in offsets:
+                    if grid[i + offset] != 1:
+                        degree += 1
+                if degree != 2:
+                    junction[i] = 1
+                    nodes.append(i)
+        self.junction = junction
+
+        # Junction: [(end, first direction, last direction, steps, turns), ...]
+        edges = {}
+        for i in nodes:
+            edges[i] = []
+            for k in range(4):
+                if grid[i + offsets[k]] != 1:
+                    end, last, steps, turns = self.walk(i, k)
+                    if end != i:
+                        edges[i].append((end, k, last, steps, turns))
+        self.edges = edges
+        self.mark = board.editMark()
+
+    def walk(self, i, k, stops = (), cells = None):
+        '''Follows the corridor leaving flat index i in direction k until it
+        reaches a junction, a cell in stops, or i again
+        cells: list to append every cell passed to, if given
+        Returns (end, last direction, steps, turns)
+        '''
+        grid = self.board.grid
+        offsets = [offset for _, _, offset in self.board.nbrOffsets]
+        junction = self.junction
+        cur = i + offsets[k]
+        steps = 1
+        turns = 0
+        while not junction[cur] and cur not in stops and cur != i:
+            if cells is not None:
+                cells.append(cur)
+            back = k ^ 2
+            for k2 in range(4):
+                if k2 != back and grid[cur + offsets[k2]] != 1:
+                    break
+            if (k ^ k2) & 1:
+                turns += 1
+            k = k2
+            cur += offsets[k]
+            steps += 1
+        return cur, k, steps, turns
+
+    def link(self, i, stops):
+        '''Returns corridor edges out of flat index i, a cell that is not a
+        junction, each stopping early at any cell of stops
+        '''
+        grid = self.board.grid
+        offsets = [offset for _, _, offset in self.board.nbrOffsets]
+        edges = []
+        for k in range(4):
+            if grid[i + offsets[k]] != 1:
+                end, last, steps, turns = self.walk(i, k, stops)
+                if end != i:
+                    edges.append((end, k, last, steps, turns))
+        return edges
+
+    def expand(self, i, k, end):
+        '''Returns the cells strictly between flat index i and end along
+        the corridor leaving i in direction k
+        '''
+        cells = []
+        self.walk(i, k, (end,), cells)
+        return cells
@@ -0,0 +1,210 @@
+from objects.Landmarks import distances
+from array import array
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ENGINES = ('numpy', 'python')
+
+# Direction codes: 0-3 index Board.nbrOffsets (S, E, N, W)
+START = 4 # Root of a search: the goal of a field
+UNSEEN = 255
+
+
+def select_engine(name = None):
+    '''Returns name of the engine to fill distance fields with: name itself
+    if given, otherwise 'numpy' when NumPy is installed and 'python' when not
+    '''
+    if name is None:
+        return 'numpy' if numpy is not None else 'python'
+    if name not in ENGINES:
+        raise ValueError('Unknown engine {!r}, expected one of {}'.format(name, ENGINES))
+    if name == 'numpy' and numpy is None:
+        raise ImportError('The numpy engine needs NumPy installed')
+    return name
+
+
+def wavefront(board, source):
+    '''NumPy version of Landmarks.distances, returning a flat int32 array
+    The frontier is an array of flat indices. Each layer adds all four
+    neighbour offsets to it at once and keeps neighbours still free in the
+    board's mask of unseen cells; the padding ring of walls keeps every
+    neighbour inside the grid. Work per layer follows the frontier size,
+    so open boards, with few wide layers, gain most
+    '''
+    cells = numpy.frombuffer(bytes(board.grid), dtype = numpy.uint8)
+    unseen = cells != 1
+    dist = numpy.full(len(cells), -1, dtype = numpy.int32)
+    if not unseen[source]:
+        return dist
+    offsets = numpy.array([offset for _, _, offset in board.nbrOffsets])
+    order = numpy.zeros(len(cells), dtype = numpy.int64) # Scratch, for dropping duplicates
+
+    unseen[source] = False
+    dist[source] = 0
+    frontier = numpy.array([source])
+    layer = 0
+    while len(frontier):
+        layer += 1
+        nbrs = (frontier[:, None] + offsets).ravel()
+        nbrs = nbrs[unseen[nbrs]]
+        # Cells reached from two sides appear twice; keep the last copy
+        order[nbrs] = numpy.arange(len(nbrs))
+        nbrs = nbrs[order[nbrs] == numpy.arange(len(nbrs))]
+        unseen[nbrs] = False
+        dist[nbrs] = layer
+        frontier = nbrs
+    return dist
+
+
+def directions(board, costs):
+    '''Returns direction code of the next step towards the source of
+    distance field costs for every cell, as a bytearray: the first of
+    Board.nbrOffsets leading to a cell one closer, START at the source and
+    UNSEEN where there is none
+    '''
+    offsets = [offset for _, _, offset in board.nbrOffsets]
+    if numpy is not None and isinstance(costs, numpy.ndarray):
+        nexts = numpy.full(len(costs), UNSEEN, dtype = numpy.uint8)
+        nexts[costs == 0] = START
+        # Later directions are written first, so earlier ones win ties
+        for k in reversed(range(4)):
+            offset = offsets[k]
+            nbr = numpy.full(len(costs), -2, dtype = costs.dtype)
+            if offset > 0:
+                nbr[:-offset] = costs[offset:]
+            else:
+                nbr[-offset:] = costs[:offset]
+            nexts[(costs > 0) & (nbr == costs - 1)] = k
+        return bytearray(nexts.tobytes())
+
+    nexts = bytearray([UNSEEN]) * len(costs)
+    south, east, north, west = offsets
+    for i, cost in enumerate(costs):
+        if cost > 0:
+            cost -= 1
+            if costs[i + south] == cost:
+                nexts[i] = 0
+            elif costs[i + east] == cost:
+                nexts[i] = 1
+            elif costs[i + north] == cost:
+                nexts[i] = 2
+            else:
+                nexts[i] = 3
+        elif cost == 0:
+            nexts[i] = START
+    return nexts
+
+
+class DistanceField:
+    def __init__(self, board, goal, engine = None):
+        '''Cost to reach goal from every cell of board, from one breadth-first
+        search outwards from goal. Each cell also stores the direction of its
+        next step towards goal, so the path from any start is read off the
+        field with no search at all, and agents can steer by it directly.
+        The field rebuilds itself on the next query after walls change.
+        Costs count steps only; turn costs depend on the direction a path
+        arrives from, which a per-cell field cannot represent.
+        board: Board object
+        goal: (x, y) tuple; a wall or a cell off the board reaches nothing
+        engine: 'numpy' to grow each layer as one vectorised step, 'python'
+                for the per-cell search, or None for numpy when it is
+                installed. Both give the same costs and directions
+        '''
+        self.board = board
+        self.goal = goal
+        self.engine = select_engine(engine)
+        self.mark = None
+        self.costs = None # Steps to goal per flat index, -1 if unreachable
+        self.nexts = None # Direction code per flat index, see directions()
+
+    def isValid(self):
+        '''Returns TRUE if the field matches the board's current walls'''
+        return self.mark == self.board.editMark()
+
+    def build(self):
+        '''Runs a breadth-first search outwards from goal over the whole board
+        Every grid step costs the same, so BFS order is Dijkstra order
+        '''
+        board = self.board
+        if not board.inBoard(*self.goal):
+            self.costs = array('i', [-1]) * len(board.grid)
+        elif self.engine == 'numpy':
+            self.costs = wavefront(board, board.index(*self.goal))
+        else:
+            self.costs = distances(board, board.index(*self.goal))
+        self.nexts = directions(board, self.costs)
+        self.mark = board.editMark()
+
+    def refresh(self):
+        '''Rebuilds the field if the board has changed since it was built'''
+        if not self.isValid():
+            self.build()
+
+    def cost(self, node):
+        '''Returns cost of the shortest path from node to goal, inf if none
+        node: (x, y) tuple
+        '''
+        self.refresh()
+        if not self.board.inBoard(*node):
+            return math.inf
+        cost = int(self.costs[self.board.index(*node)])
+        return math.inf if cost < 0 else cost
+
+    def direction(self, node):
+        '''Returns (dx, dy) of the next step from node towards goal,
+        None at goal or where goal cannot be reached
+        node: (x, y) tuple
+        '''
+        self.refresh()
+        if not self.board.inBoard(*node):
+            return None
+        k = self.nexts[self.board.index(*node)]
+        if k >= START:
+            return None
+        return self.board.nbrOffsets[k][:2]
+
+    def path(self, start):
+        '''Returns shortest path from start to goal as a list of (x, y) tuples,
+        empty if there is none, by following next-step directions
+        start: (x, y) tuple
+        '''
+        self.refresh()
+        board = self.board
+        if not board.inBoard(*start):
+            return []
+        offsets = [offset for _, _, offset in board.nbrOffsets]
+        nexts = self.nexts
+        i = board.index(*start)
+        if nexts[i] == UNSEEN:
+            return []
+        path = [i]
+        while nexts[i] != START:
+            i += offsets[nexts[i]]
+            path.append(i)
+        return [board.coords(i) for i in path]
+
+    def reached(self):
+        '''Returns number of cells that can reach goal, goal included'''
+        self.refresh()
+        costs = self.costs
+        if numpy is not None and isinstance(costs, numpy.ndarray):
+            return int(numpy.count_nonzero(costs >= 0))
+        return sum(1 for cost in costs if cost >= 0)
+
+    def within(self, limit):
+        '''Returns cells closer than limit to goal as (x, y) tuples,
+        nearest first
+        '''
+        self.refresh()
+        costs = self.costs
+        if numpy is not None and isinstance(costs, numpy.ndarray):
+            cells = numpy.flatnonzero((costs >= 0) & (costs < limit))
+            cells = cells[numpy.argsort(costs[cells], kind = 'stable')].tolist()
+        else:
+            cells = [i for i in range(len(costs)) if 0 <= costs[i] < limit]
+            cells.sort(key = costs.__getitem__)
+        return [self.board.coords(i) for i in cells]
@@ -1,21 +1,42 @@
 import curses
 import time
-from objects.PathPlanners import Dijkstra, AStar, Greedy, DijkstraBD, AStarBD, GreedyBD
-from objects.Board import Board
+from objects.PathPlanners import Dijkstra, AStar, Greedy, DijkstraBD, GreedyBD, NBAStar, JPS, LPAStar, BFS
+from objects.PathPlanners import EXPANDED, FOUND, SearchResult
+from objects.PathCache import PathCache
+from objects.Profiler import Profiler
+from objects.Viewport import Viewport
 from objects.Menu import *
 
+FRAME_RATE = 60 # Target animation frames per second
+EXPANSION_RATE = 1000 # Expanded nodes animated per second
+PATH_RATE = 100 # Path cells drawn per second, at least
+PATH_TIME = 2 # Most seconds spent drawing a path
+CACHE_SIZE = 64 # Paths remembered across searches
+STATS = ['Expanded', 'Pushes', 'Stale pops', 'Peak open', 'Path cost', 'Time (ms)']
+MENU_WIDTH, MENU_HEIGHT = 24, 37
+MIN_VIEW = 10 # Fewest board cells shown across
+MIN_LINES, MIN_COLS = MENU_HEIGHT + 2, MENU_WIDTH + 6 + MIN_VIEW * 2
+
 class Game:
-    def __init__(self, board, screen):
-        '''Initialisation'''
+    def __init__(self, board, screen, profiler = None):
+        '''Initialisation
+        profiler: Profiler timing search, render and sleep phases, if any
+        '''
+        self.profiler = profiler if profiler is not None else Profiler()
         self.mode = 0 # 0 - Simulation, 1 - Board Edit, 2 – Cursor Edit
 
         self.board = board
         self.screen = screen
+
+        # Board on the left, as much of it as fits beside the menu
+        lines, cols = self.screen.getmaxyx()
+        self.view = Viewport(board, 1, 2, lines - 2, (cols - MENU_WIDTH - 6) // 2)
         self.generate_menus()
         self.menu = 0 # 0 - Simulation, 1 - Board Edit, 2 - Editing Instructions
 
         self.initialise_curses()
-        self.board.draw(self.screen)
+        self.view.follow(*self.board.start)
+        self.view.draw()
         self.menus[self.menu].display()
 
         self.player = 0
@@ -24,9 +45,13 @@ class Game:
                         2: self.board.cursor}
         self.planner = 0
         self.planners = {0: [Dijkstra, DijkstraBD], 
-                         1: [AStar, AStarBD], 
-                         2: [Greedy, GreedyBD]}
+                         1: [AStar, NBAStar], 
+                         2: [Greedy, GreedyBD],
+                         3: [JPS, JPS], # No bidirectional JPS
+                         4: [BFS, BFS]} # or breadth-first search
         self.cursor_mode = 0
+        self.replanner = None # Incremental planner kept between live edits
+        self.cache = PathCache(CACHE_SIZE)
 
         self.searchActive = False
         self.isRunning = True
@@ -34,7 +59,8 @@ class Game:
 
     def generate_menus(self):
         '''Generates game menus'''
-        menu_sim = Menu(94, 1, 24, 37,
+        x = self.view.x + self.view.width * 2 + 2
+        menu_sim = Menu(x, 1, MENU_WIDTH, MENU_HEIGHT,
                         [
                          Title('PATHFINDING', 20),
                          Spacer(1),
@@ -42,36 +68,43 @@ class Game:
                          RadioGroupSingle([
                                            Radio('Dijkstra'),
                                            Radio('A Star'),
-                                           Radio('Best First')
+                                           Radio('Best First'),
+                                           Radio('Jump Point'),
+                                           Radio('Breadth First')
                                           ],
-                                          20),
+                                          20, 1),
                          Heading('Cost', 20),
                          RadioGroupSingle([
                                            Radio('Manhattan'),
                                            Radio('Euclidean')
                                           ],
-                                          20),
+                                          20, 1),
                          Heading('Heuristic', 20),
                          RadioGroupSingle([
                                            Radio('Manhattan'),
-                                           Radio('Euclidean')
+                                           Radio('Euclidean'),
+                                           Radio('Landmarks')
                                           ],
-                                          20),
+                                          20, 1),
                          Heading('Options', 20),
                          RadioGroupMultiple([
                                              Radio('Bidirectional'),
+                                             Radio('Corridors')
                                             ],
-                                            20),
-                         Button('Pathfind', self.search, 20, 3),
-                         Button('Edit Board', lambda: self.switch_menu(1), 20, 3),
+                                            20, 1),
+                         ButtonGroup([
+                                      Button('Pathfind', self.search, 10, 3),
+                                      Button('Edit', lambda: self.switch_menu(1), 9, 3)
+                                     ], 20),
                          ButtonGroup([
                                       Button('Clear', self.clear, 13, 3),
                                       Button('Quit', self.quit, 6, 3)
-                                     ], 20)
-                        ],
+                                     ], 20),
+                         Heading('Stats', 20)
+                        ] + [Text(self.stat_line(name, None), 20) for name in STATS],
                         self.screen)
 
-        menu_edit = Menu(94, 1, 24, 37,
+        menu_edit = Menu(x, 1, MENU_WIDTH, MENU_HEIGHT,
                          [
                           Title('Board Edit', 20),
                           Spacer(1),
@@ -90,7 +123,7 @@ class Game:
                          ],
                          self.screen)
 
-        menu_startgoal = Menu(94, 1, 24, 37,
+        menu_startgoal = Menu(x, 1, MENU_WIDTH, MENU_HEIGHT,
                               [
                                Spacer(12),
                                Heading('Controls', 20),
@@ -100,7 +133,7 @@ class Game:
                               ],
                               self.screen)
 
-        menu_cursor = Menu(94, 1, 24, 37,
+        menu_cursor = Menu(x, 1, MENU_WIDTH, MENU_HEIGHT,
                               [
                                Title('Controls', 20),
                                Spacer(2),
@@ -128,6 +161,7 @@ class Game:
 
     def initialise_curses(self):
         self.screen.clear()
+        self.screen.refresh() # So later refreshes never blank the board pad
         curses.curs_set(0)
         curses.use_default_colors()
 
@@ -142,7 +176,8 @@ class Game:
     def start(self):
         '''Main loop'''
         while self.isRunning:
-            key = self.screen.getch()
+            with self.profiler.phase('input'):
+                key = self.screen.getch()
             if self.mode == 0: 
                 # Simulation
                 if key == curses.KEY_UP:
@@ -155,6 +190,7 @@ class Game:
                     self.menus[self.menu].navX(-1)
                 elif key == ord(' '):
                     self.menus[self.menu].select()
+                    self.update_options()
 
             else: # self.mode == 1 or self.mode == 2
                 # Start/Goal edit
@@ -189,44 +225,164 @@ class Game:
                 if self.searchActive:
                     self.search(False)
 
-            self.board.draw(self.screen)
-            if self.mode == 2:
-                self.board.draw_cursor(self.screen)
-            self.menus[self.menu].display()
+            with self.profiler.phase('render'):
+                self.view.draw(cursor = self.mode == 2)
+                self.menus[self.menu].display()
 
     def search(self, animate = True):
         '''Searches for path from start to goal using selected pathfinder'''
         self.board.clearPath()
-        self.board.draw(self.screen)
+        with self.profiler.phase('render'):
+            self.view.draw()
 
         # Set pathfinding parameters
         mode_c = self.menus[0].items[5].state
         mode_h = self.menus[0].items[7].state
-        planner = self.menus[0].items[3].state
         bd = self.menus[0].items[9].radios[0].state
+        corridors = self.menus[0].items[9].radios[1].state and self.menus[0].items[9].radios[1].enabled
+        planner = self.planners[self.menus[0].items[3].state][bd]
 
-        # Create pathfinder object
-        pathfinder = self.planners[planner][bd](self.board, mode_c, mode_h)
-        if animate:
-            path = pathfinder.search(self.board.start, self.board.goal, self.screen)
+        if animate or not planner.turnBlind:
+            # Create pathfinder object
+            pathfinder = planner(self.board, mode_c, mode_h, corridors = corridors, stats = True)
         else:
-            path = pathfinder.search(self.board.start, self.board.goal)
+            # Live replanning after edits only repairs what the edits changed.
+            # LPA* ignores turn costs, so it only stands in for planners that
+            # ignore them too
+            if (self.replanner is None
+                    or (self.replanner.mode_c, self.replanner.mode_h) != (mode_c, mode_h)):
+                self.replanner = LPAStar(self.board, mode_c, mode_h, stats = True)
+            pathfinder = self.replanner
+
+        # Unchanged board and settings: reuse the last path instead of searching
+        start, goal = self.board.start, self.board.goal
+        path = self.cache.get(pathfinder, start, goal)
+        if path is None:
+            events = self.profiler.timed('search', pathfinder.steps(start, goal))
+            if animate:
+                path = self.animate(events)
+            else:
+                path = self.replay(events)
+            self.cache.put(pathfinder, start, goal, path)
+
+        with self.profiler.phase('render'):
+            self.show_stats(path, pathfinder)
 
         # Draw path if found
         if path:
-            for node in path:
-                i, j = node
-                self.board[j][i] = 2
-                self.board.draw_cell(i, j, self.screen)
-                self.board.draw_start(self.screen)
-                self.board.draw_goal(self.screen)
-                if animate:
-                    self.screen.refresh()
-                    time.sleep(0.02)
+            if animate:
+                self.draw_path(path)
+            else:
+                for i, j in path:
+                    self.board[j][i] = 2
 
         curses.flushinp() # Clears key inputs from queue
         self.searchActive = True
 
+    def update_options(self):
+        '''Disables the Corridors option for planners that cannot use it'''
+        planner = self.menus[0].items[3].state
+        bd = self.menus[0].items[9].radios[0].state
+        corridors = self.menus[0].items[9].radios[1]
+        corridors.enabled = self.planners[planner][bd].corridorSearch
+
+    def stat_line(self, name, value):
+        '''Formats one line of the stats panel'''
+        if value is None:
+            value = '-'
+        elif isinstance(value, float):
+            value = '{:.1f}'.format(value)
+        return '{:<11}{:>9}'.format(name, value)
+
+    def show_stats(self, path, pathfinder):
+        '''Shows counters of the last search in the stats panel
+        Paths served from the cache have only a cost. Live replanning for
+        turn-blind planners runs LPA* instead, so the heading says so
+        '''
+        if isinstance(path, SearchResult):
+            elapsed = path.elapsed * 1000 if path.elapsed is not None else None
+            values = [path.expanded, path.pushes, path.stalePops, path.peakOpen,
+                      path.cost, elapsed]
+        else:
+            values = [None] * 4 + [pathfinder.pathCost(path) if path else None, None]
+        heading = self.menus[0].items[-len(STATS) - 1]
+        heading.text = 'Stats: LPA* replan' if pathfinder is self.replanner else 'Stats'
+        lines = self.menus[0].items[-len(STATS):]
+        for line, name, value in zip(lines, STATS, values):
+            line.text = self.stat_line(name, value)
+        if self.menu == 0:
+            self.menus[0].display()
+
+    def animate(self, events):
+        '''Draws search events at a fixed frame rate and returns the path found
+        Each frame applies every expansion due by EXPANSION_RATE, so when the
+        terminal falls behind, frames are skipped rather than the search slowed
+        '''
+        start = time.perf_counter()
+        frame = start + 1 / FRAME_RATE
+        due = EXPANSION_RATE / FRAME_RATE
+        expanded = 0
+        for kind, data in events:
+            if kind == FOUND:
+                break
+            i, j = data
+            self.board[j][i] = 3 if kind == EXPANDED else 4
+            if kind == EXPANDED:
+                expanded += 1
+                if expanded >= due:
+                    # Camera kept on the frontier
+                    frame = self.show_frame(i, j, frame)
+                    due = (frame - start) * EXPANSION_RATE
+
+        with self.profiler.phase('render'):
+            self.view.draw()
+        return data
+
+    def draw_path(self, path):
+        '''Draws path a frame at a time, at PATH_RATE cells per second or
+        faster if that would take longer than PATH_TIME
+        '''
+        rate = max(PATH_RATE, len(path) / PATH_TIME)
+        start = time.perf_counter()
+        frame = start + 1 / FRAME_RATE
+        due = rate / FRAME_RATE
+        for drawn, (i, j) in enumerate(path, 1):
+            self.board[j][i] = 2
+            if drawn >= due:
+                frame = self.show_frame(i, j, frame)
+                due = (frame - start) * rate
+
+        with self.profiler.phase('render'):
+            self.view.follow(i, j)
+            self.view.draw()
+
+    def show_frame(self, i, j, frame):
+        '''Redraws cells changed since the last frame, with the camera on
+        cell (i, j), then waits until frame, the time this frame is due.
+        A late frame is shown at once instead.
+        Returns the time the next frame is due
+        '''
+        with self.profiler.phase('render'):
+            self.view.follow(i, j)
+            self.view.draw()
+        now = time.perf_counter()
+        if now < frame:
+            with self.profiler.phase('sleep'):
+                time.sleep(frame - now) # Slow down animation
+        else:
+            frame = now
+        return frame + 1 / FRAME_RATE
+
+    def replay(self, events):
+        '''Marks search events on the board without drawing them
+        and returns the path found
+        '''
+        for kind, data in events:
+            if kind == FOUND:
+                return data
+            i, j = data
+            self.board[j][i] = 3 if kind == EXPANDED else 4
+
     def set_player(self, n):
         '''Sets player (start, goal or cursor)'''
         self.player = n
@@ -243,11 +399,14 @@ class Game:
         ''' Moves "player" (ie. start, goal, cursor) '''
         if self.player == 0:
             self.board.moveStart(direction)
+            self.view.follow(*self.board.start)
         elif self.player == 1:
             self.board.moveGoal(direction)
+            self.view.follow(*self.board.goal)
         else:
             self.board.moveCursor(direction)
             x, y = self.board.cursor
+            self.view.follow(x, y)
             if self.cursor_mode == 0:
                 if self.board[y][x] == 1:
                     self.menus[3].items[8].text = 'SPACE: Remove Walls'
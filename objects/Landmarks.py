@@ -0,0 +1,100 @@
+from array import array
+
+
+def distances(board, source):
+    '''Returns step distances from flat index source to every cell of board,
+    as an array('i') holding -1 for walls and unreachable cells. A wall
+    source reaches nothing
+    '''
+    grid = board.grid
+    offsets = [offset for _, _, offset in board.nbrOffsets]
+    costs = array('i', [-1]) * len(grid)
+    if grid[source] == 1:
+        return costs
+    costs[source] = 0
+    frontier = [source]
+    cost = 0
+    while frontier:
+        cost += 1
+        layer = []
+        for cur in frontier:
+            for offset in offsets:
+                nbr = cur + offset
+                if grid[nbr] != 1 and costs[nbr] < 0:
+                    costs[nbr] = cost
+                    layer.append(nbr)
+        frontier = layer
+    return costs
+
+
+class LandmarkTable:
+    def __init__(self, board, k = 8):
+        '''Distances from k landmark cells, for the ALT heuristic
+        (A*, Landmarks, Triangle inequality). For any landmark L,
+        |d(L, a) - d(L, b)| never overestimates d(a, b), and in mazes it is
+        far tighter than Manhattan or Euclidean distance.
+        The table rebuilds itself on the next estimate after walls change.
+        board: Board object
+        k: number of landmarks
+        '''
+        self.board = board
+        self.k = k
+        self.mark = None
+        self.landmarks = []
+        self.tables = []
+
+    def copy(self, board):
+        '''Returns a copy of the table for a copy of its board'''
+        table = LandmarkTable(board, self.k)
+        table.mark = self.mark
+        table.landmarks = list(self.landmarks)
+        table.tables = self.tables # Never modified in place, so safe to share
+        return table
+
+    def refresh(self):
+        '''Rebuilds the table if the board's walls have changed since'''
+        if self.mark != self.board.editMark():
+            self.build()
+
+    def build(self):
+        '''Picks landmarks by farthest-point selection: each new landmark is
+        the cell farthest from every landmark chosen so far, with cells no
+        landmark reaches counting as farthest of all
+        '''
+        board = self.board
+        grid = board.grid
+        far = len(grid) # Further than any real distance
+        self.landmarks = []
+        self.tables = []
+
+        free = [i for i in range(len(grid)) if grid[i] != 1]
+        if free:
+            # Start from the cell farthest from an arbitrary one, on the rim
+            seed = distances(board, free[0])
+            nearest = array('i', [-1]) * len(grid)
+            for i in free:
+                nearest[i] = far
+            landmark = max(free, key = seed.__getitem__)
+            while len(self.landmarks) < self.k:
+                costs = distances(board, landmark)
+                self.landmarks.append(landmark)
+                self.tables.append(costs)
+                for i in free:
+                    if 0 <= costs[i] < nearest[i]:
+                        nearest[i] = costs[i]
+                landmark = max(free, key = nearest.__getitem__)
+                if nearest[landmark] == 0:
+                    break # Every free cell is already a landmark
+        self.mark = board.editMark()
+
+    def estimate(self, i, j):
+        '''Returns lower bound on step distance between flat indices i and j'''
+        best = 0
+        for costs in self.tables:
+            a = costs[i]
+            b = costs[j]
+            if a >= 0 and b >= 0:
+                d = a - b if a > b else b - a
+                if d > best:
+                    best = d
+        return best
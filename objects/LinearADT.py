@@ -74,6 +74,9 @@ class PriorityQueue2:
     def __init__(self):
         self.items = []
 
+    def __len__(self):
+        return len(self.items)
+
     def isEmpty(self):
         return self.items == []
 
@@ -84,3 +87,210 @@ class PriorityQueue2:
         return heapq.heappop(self.items)[1]
 
 
+
+
+class IndexedPriorityQueue:
+    '''Binary min-heap that tracks each item's position, so an item can be
+    found in O(1) and have its priority changed in O(log n).
+    Enqueueing an item already on the heap updates it in place instead of
+    pushing a duplicate, so the heap never holds stale entries.
+    '''
+    def __init__(self):
+        self.items = []
+        self.priorities = []
+        self.positions = {}
+
+        # Each update is a duplicate entry (and later stale pop) avoided
+        self.updates = 0
+        self.peak = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def isEmpty(self):
+        return not self.items
+
+    def contains(self, item):
+        return item in self.positions
+
+    def getPriority(self, item):
+        return self.priorities[self.positions[item]]
+
+    def topPriority(self):
+        '''Returns lowest priority on the heap without removing it'''
+        return self.priorities[0]
+
+    def enqueue(self, item, priority):
+        i = self.positions.get(item)
+        if i is not None:
+            self.updates += 1
+            self.setPriority(item, priority)
+            return
+
+        self.items.append(item)
+        self.priorities.append(priority)
+        i = len(self.items) - 1
+        self.positions[item] = i
+        self.percUp(i)
+        if i >= self.peak:
+            self.peak = i + 1
+
+    def dequeue(self):
+        if not self.items:
+            print('Priority Queue already empty!')
+            return None
+        res = self.items[0]
+        del self.positions[res]
+        item = self.items.pop()
+        priority = self.priorities.pop()
+        if self.items:
+            self.items[0] = item
+            self.priorities[0] = priority
+            self.positions[item] = 0
+            self.percDown(0)
+        return res
+
+    def remove(self, item):
+        '''Removes an item from anywhere in the heap'''
+        i = self.positions.pop(item)
+        last = self.items.pop()
+        priority = self.priorities.pop()
+        if i < len(self.items):
+            # Fill the hole with the last item, then restore heap order
+            old = self.priorities[i]
+            self.items[i] = last
+            self.priorities[i] = priority
+            self.positions[last] = i
+            if priority < old:
+                self.percUp(i)
+            else:
+                self.percDown(i)
+
+    def setPriority(self, item, priority):
+        '''Changes priority of an item already on the heap'''
+        i = self.positions[item]
+        old = self.priorities[i]
+        self.priorities[i] = priority
+        if priority < old:
+            self.percUp(i)
+        elif priority > old:
+            self.percDown(i)
+
+    def percUp(self, i):
+        items, priorities, positions = self.items, self.priorities, self.positions
+        item, priority = items[i], priorities[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if priorities[parent] <= priority:
+                break
+            # Move parent down into the hole
+            items[i] = items[parent]
+            priorities[i] = priorities[parent]
+            positions[items[i]] = i
+            i = parent
+        items[i] = item
+        priorities[i] = priority
+        positions[item] = i
+
+    def percDown(self, i):
+        items, priorities, positions = self.items, self.priorities, self.positions
+        n = len(items)
+        item, priority = items[i], priorities[i]
+        while True:
+            child = 2*i + 1
+            if child >= n:
+                break
+            if child + 1 < n and priorities[child + 1] < priorities[child]:
+                child += 1
+            if priorities[child] >= priority:
+                break
+            # Move smaller child up into the hole
+            items[i] = items[child]
+            priorities[i] = priorities[child]
+            positions[items[i]] = i
+            i = child
+        items[i] = item
+        priorities[i] = priority
+        positions[item] = i
+
+
+class BucketQueue:
+    '''Dial's bucket queue, for priorities that become integers once scaled.
+    Each integer key has its own bucket, so enqueue and dequeue are amortised
+    O(1) with no heap comparisons. Keys below the current bucket (eg. from
+    an inconsistent heuristic) are still handled by moving the scan back.
+    '''
+    def __init__(self, scale = 1):
+        self.scale = scale
+        self.buckets = []
+        self.cur = 0
+        self.len = 0
+
+    def __len__(self):
+        return self.len
+
+    def isEmpty(self):
+        return self.len == 0
+
+    def enqueue(self, item, priority):
+        key = int(priority * self.scale + 0.5)
+        buckets = self.buckets
+        if key >= len(buckets):
+            buckets.extend([] for _ in range(key - len(buckets) + 1))
+        buckets[key].append(item)
+        if key < self.cur:
+            self.cur = key
+        self.len += 1
+
+    def dequeue(self):
+        if self.len == 0:
+            print('Priority Queue already empty!')
+            return None
+        buckets = self.buckets
+        cur = self.cur
+        while not buckets[cur]:
+            cur += 1
+        self.cur = cur
+        self.len -= 1
+        return buckets[cur].pop()
+
+
+class CountingQueue:
+    '''Wraps an open list, counting pushes, pops, pops of items already
+    popped before (stale duplicates or re-expansions) and its peak size.
+    Other methods pass straight through to the wrapped queue.
+    '''
+    def __init__(self, queue):
+        self.queue = queue
+        self.reset()
+
+    def reset(self):
+        self.pushes = 0
+        self.pops = 0
+        self.stale = 0
+        self.peak = len(self.queue)
+        self.popped = set()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def __getattr__(self, name):
+        return getattr(self.queue, name)
+
+    def isEmpty(self):
+        return self.queue.isEmpty()
+
+    def enqueue(self, item, priority):
+        self.queue.enqueue(item, priority)
+        self.pushes += 1
+        if len(self.queue) > self.peak:
+            self.peak = len(self.queue)
+
+    def dequeue(self):
+        item = self.queue.dequeue()
+        self.pops += 1
+        if item in self.popped:
+            self.stale += 1
+        else:
+            self.popped.add(item)
+        return item
@@ -0,0 +1,214 @@
+'''Maze generators working in place on a board's flat grid
+
+Maze cells sit at odd (x, y) board coordinates and the cells between them
+are the walls that get opened. Every generator is iterative, so board size
+is bounded by memory rather than the recursion limit, and draws all its
+randomness from the rng passed in (a random.Random, or the random module).
+'''
+from array import array
+from itertools import permutations
+
+
+def fence(board, value):
+    '''Sets the padding ring around board's grid to value
+    Generators give it a value their loops skip, so stepping two cells off
+    the board never needs a bounds check, then set it back to walls
+    '''
+    grid = board.grid
+    stride = board.stride
+    rows = len(grid) // stride
+    grid[:stride] = bytes([value]) * stride
+    grid[-stride:] = bytes([value]) * stride
+    grid[::stride] = bytes([value]) * rows
+    grid[stride - 1::stride] = bytes([value]) * rows
+
+
+def cells(board):
+    '''Returns flat indices of every maze cell of board, row by row'''
+    cells = []
+    for y in range(1, board.l - 1, 2):
+        base = board.index(0, y)
+        cells.extend(range(base + 1, base + board.w - 1, 2))
+    return cells
+
+
+def shuffles(board):
+    '''Returns every ordering of (step to neighbouring cell, step to the
+    wall between), so picking one at random shuffles the four directions
+    '''
+    return list(permutations([(2 * offset, offset) for _, _, offset in board.nbrOffsets]))
+
+
+def backtracker(board, rng):
+    '''Depth-first search with an explicit stack: long winding corridors
+    with few dead ends
+    '''
+    grid = board.grid
+    orders = shuffles(board)
+    rand = rng.random
+    fence(board, 0)
+
+    i = rng.choice(cells(board))
+    grid[i] = 0
+    stack = [i]
+    while True:
+        # First unvisited neighbour in a random order is a uniform choice
+        for step, half in orders[int(rand() * 24)]:
+            if grid[i + step]:
+                grid[i + half] = 0
+                i += step
+                grid[i] = 0
+                stack.append(i)
+                break
+        else:
+            stack.pop()
+            if not stack:
+                break
+            i = stack[-1]
+    fence(board, 1)
+
+
+def kruskal(board, rng):
+    '''Opens walls in random order whenever they join two separate trees:
+    many short dead ends
+    '''
+    grid = board.grid
+    stride = board.stride
+    # Walls between horizontally then vertically adjacent cells
+    walls = []
+    for y in range(1, board.l - 1, 2):
+        base = board.index(0, y)
+        walls.extend(range(base + 2, base + board.w - 2, 2))
+    for y in range(2, board.l - 2, 2):
+        base = board.index(0, y)
+        walls.extend(range(base + 1, base + board.w - 1, 2))
+    rng.shuffle(walls)
+
+    # Union-find over flat indices; every cell starts as its own tree
+    parents = array('i', range(len(grid)))
+    for i in cells(board):
+        grid[i] = 0
+    for wall in walls:
+        offset = 1 if grid[wall - 1] == 0 else stride
+        a = wall - offset
+        while parents[a] != a:
+            parents[a] = a = parents[parents[a]]
+        b = wall + offset
+        while parents[b] != b:
+            parents[b] = b = parents[parents[b]]
+        if a != b:
+            parents[a] = b
+            grid[wall] = 0
+
+
+def prim(board, rng):
+    '''Grows one tree from a random cell, attaching a random frontier cell
+    each step: short, branching corridors radiating from the seed
+    '''
+    grid = board.grid
+    steps = [2 * offset for _, _, offset in board.nbrOffsets]
+    orders = shuffles(board)
+    rand = rng.random
+    fence(board, 3)
+
+    # 2 marks cells already on the frontier, 3 is off the board
+    first = rng.choice(cells(board))
+    grid[first] = 0
+    frontier = []
+    for step in steps:
+        if grid[first + step] == 1:
+            grid[first + step] = 2
+            frontier.append(first + step)
+    while frontier:
+        k = int(rand() * len(frontier))
+        i = frontier[k]
+        frontier[k] = frontier[-1]
+        frontier.pop()
+
+        # Join to a random neighbour already in the maze
+        for step, half in orders[int(rand() * 24)]:
+            if grid[i + step] == 0:
+                grid[i + half] = 0
+                break
+        grid[i] = 0
+        for step in steps:
+            if grid[i + step] == 1:
+                grid[i + step] = 2
+                frontier.append(i + step)
+    fence(board, 1)
+
+
+def wilson(board, rng):
+    '''Loop-erased random walks from each cell until they hit the maze:
+    a uniformly random spanning tree, with no bias in corridor shape.
+    Slowest of the generators, as the first walks wander a long way
+    '''
+    grid = board.grid
+    steps = [2 * offset for _, _, offset in board.nbrOffsets]
+    rand = rng.random
+    fence(board, 2) # Off the board, never walked onto
+
+    # Direction last taken out of each cell; later visits overwrite it,
+    # which erases any loop the walk made
+    nexts = bytearray(len(grid))
+    order = cells(board)
+    rng.shuffle(order)
+    grid[order[0]] = 0
+    for start in order:
+        i = start
+        while grid[i] == 1:
+            k = int(rand() * 4)
+            while grid[i + steps[k]] == 2:
+                k = int(rand() * 4)
+            nexts[i] = k
+            i += steps[k]
+        i = start
+        while grid[i] == 1:
+            step = steps[nexts[i]]
+            grid[i] = 0
+            grid[i + step // 2] = 0
+            i += step
+    fence(board, 1)
+
+
+def division(board, rng):
+    '''Starts from an empty board and splits each chamber in two with a
+    wall holding one gap: long straight walls and a visible grid of rooms
+    '''
+    grid = board.grid
+    stride = board.stride
+    rand = rng.random
+    grid[:] = b'\x01' * len(grid)
+    gap = bytes(board.w - 2)
+    for y in range(1, board.l - 1):
+        i = board.index(1, y)
+        grid[i:i + board.w - 2] = gap
+
+    # Chambers as (x, y, width, height) in cells
+    chambers = [(0, 0, board.w // 2, board.l // 2)]
+    while chambers:
+        x, y, width, height = chambers.pop()
+        if width < 2 or height < 2:
+            continue
+        if height > width or (height == width and rand() < 0.5):
+            # Horizontal wall below cell row y + k - 1, gap in column x + g
+            k = 1 + int(rand() * (height - 1))
+            g = x + int(rand() * width)
+            i = board.index(2 * x + 1, 2 * (y + k))
+            grid[i:i + 2 * width - 1] = b'\x01' * (2 * width - 1)
+            grid[board.index(2 * g + 1, 2 * (y + k))] = 0
+            chambers.append((x, y, width, k))
+            chambers.append((x, y + k, width, height - k))
+        else:
+            # Vertical wall right of cell column x + k - 1, gap in row y + g
+            k = 1 + int(rand() * (width - 1))
+            g = y + int(rand() * height)
+            i = board.index(2 * (x + k), 2 * y + 1)
+            grid[i:i + (2 * height - 1) * stride:stride] = b'\x01' * (2 * height - 1)
+            grid[board.index(2 * (x + k), 2 * g + 1)] = 0
+            chambers.append((x, y, k, height))
+            chambers.append((x + k, y, width - k, height))
+
+
+GENERATORS = {'backtracker': backtracker, 'kruskal': kruskal, 'prim': prim,
+              'wilson': wilson, 'division': division}
@@ -65,17 +65,18 @@ class Menu:
 # RADIO ITEMS ========================
 
 class RadioGroup:
-    def __init__(self, radios, width):
+    def __init__(self, radios, width, spacing=2):
         self.radios = radios
         self.pos = 0
         
         self.width = width
-        self.height = len(self.radios) * 2 + 1
+        self.spacing = spacing # Rows per radio
+        self.height = len(self.radios) * spacing + 1
 
     def display(self, x, y, width, height, selected, screen):
         for idx, radio in enumerate(self.radios):
             radio_selected = True if selected and idx == self.pos else False
-            radio.display(x, 1+y+idx*2, radio_selected, screen)
+            radio.display(x, 1+y+idx*self.spacing, radio_selected, screen)
 
     def nav(self, n):
         self.pos += n
@@ -95,8 +96,8 @@ class RadioGroup:
 
 class RadioGroupSingle(RadioGroup):
     '''Radio group that allows only single selection'''
-    def __init__(self, radios, width):
-        super().__init__(radios, width)
+    def __init__(self, radios, width, spacing=2):
+        super().__init__(radios, width, spacing)
         self.state = 0
         self.radios[self.pos].state = True
         
@@ -116,17 +117,22 @@ class Radio:
     def __init__(self, text, state=False):
         self.text = text
         self.state = state
+        self.enabled = True # Disabled radios show (-) and ignore selection
 
     def display(self, x, y, selected, screen):
         attr = curses.A_REVERSE if selected else curses.A_NORMAL
         screen.addstr(y, x, self.string(), attr)
 
     def string(self):
-        radio = '(o) ' if self.state else '( ) '
+        if not self.enabled:
+            radio = '(-) '
+        else:
+            radio = '(o) ' if self.state else '( ) '
         return radio + self.text
 
     def run(self):
-        self.state = not(self.state)
+        if self.enabled:
+            self.state = not(self.state)
 
     def focus(self, n):
         '''Returns True if key up/down allowed to nav away from button'''
@@ -0,0 +1,58 @@
+from collections import OrderedDict
+
+
+class PathCache:
+    def __init__(self, size = 128):
+        '''Least-recently-used cache of planned paths
+        Keys include the board's version, so any edit to the board
+        makes its old entries unreachable; they age out as new ones arrive
+        size: maximum number of paths kept
+        '''
+        self.size = size
+        self.paths = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, planner, start, goal):
+        '''Cache key for planner's search from start to goal'''
+        board = planner.board
+        return (id(board), board.version, start, goal,
+                type(planner), planner.mode_c, planner.mode_h, planner.options())
+
+    def get(self, planner, start, goal):
+        '''Returns cached path as a list of (x, y) tuples, or None if missing'''
+        key = self.key(planner, start, goal)
+        path = self.paths.get(key)
+        if path is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.paths.move_to_end(key)
+        return list(path)
+
+    def put(self, planner, start, goal, path):
+        '''Stores path, evicting the least recently used path if full'''
+        key = self.key(planner, start, goal)
+        self.paths[key] = tuple(path)
+        self.paths.move_to_end(key)
+        while len(self.paths) > self.size:
+            self.paths.popitem(last = False)
+
+    def search(self, planner, start, goal):
+        '''Returns planner's path from start to goal, searching only on a miss'''
+        path = self.get(planner, start, goal)
+        if path is None:
+            path = list(planner.search(start, goal))
+            self.put(planner, start, goal, path)
+        return path
+
+    def hitRate(self):
+        '''Returns fraction of lookups served from the cache'''
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        '''Empties cache and resets statistics'''
+        self.paths.clear()
+        self.hits = 0
+        self.misses = 0
@@ -1,76 +1,503 @@
-from objects.LinearADT import PriorityQueue, PriorityQueue2
-import curses
+from objects.LinearADT import PriorityQueue2, IndexedPriorityQueue, BucketQueue, CountingQueue
+from objects.Clusters import ClusterGraph
+from objects.Corridors import CorridorGraph
+from objects.Landmarks import LandmarkTable
+from objects.DistanceField import DistanceField, select_engine
+# Parent codes for indexed searches: 0-3 index Board.nbrOffsets (S, E, N, W)
+from objects.DistanceField import START, UNSEEN
+from array import array
 import math
 import time
 
+# Search events yielded by steps(): (EXPANDED, (x, y)), (FRONTIER, (x, y)), (FOUND, path)
+EXPANDED = 0
+FRONTIER = 1
+FOUND = 2
+
+
+class SearchResult(list):
+    def __init__(self, path = ()):
+        '''Path found by a search, as a list of (x, y) tuples, with counters.
+        elapsed is the search time in seconds; the rest stay None unless the
+        planner was created with stats = True.
+        expanded: nodes taken off the open list for the first time
+        pushes: insertions into the open list
+        stalePops: removals of nodes already taken off before
+        peakOpen: largest open list size (summed over both sides)
+        cost: path cost including turn costs, inf if there is no path
+        '''
+        super().__init__(path)
+        self.expanded = None
+        self.pushes = None
+        self.stalePops = None
+        self.peakOpen = None
+        self.cost = None
+        self.elapsed = None
+
 
 class Dijkstra:
-    def __init__(self, board, mode_c, mode_h):
+    turnCost = 0.2
+    bucketScale = 5 # Makes turnCost, and so every priority, an integer
+    bidirectional = False
+    # Most a path may cost as a multiple of the cheapest. Searches over cells
+    # price a turn only by the step a cell was reached with, so with turn
+    # costs the exact searches are exact to within a few percent
+    suboptimality = 1
+    corridorSearch = True # Honours corridors = True
+    turnBlind = False # Search ignores turn costs, though pathCost counts them
+
+    def __init__(self, board, mode_c, mode_h, indexed = False, queue = PriorityQueue2,
+                 corridors = False, stats = False):
+        '''board: Board object
+        mode_c: 0 - Manhattan, 1 - Euclidean
+        mode_h: 0 - Manhattan, 1 - Euclidean, 2 - Landmarks
+        indexed: search over flat cell indices with array-backed state
+        queue: open list class, eg. PriorityQueue2 (lazy duplicate insertion),
+               IndexedPriorityQueue (decrease-key) or BucketQueue (integer costs)
+        corridors: search the board's junction graph, with each corridor
+                   collapsed into one edge (always one-directional)
+        stats: count open list operations for each SearchResult
+        '''
+        if corridors and not self.corridorSearch:
+            raise ValueError('{} cannot search corridors'.format(type(self).__name__))
         self.board = board
         self.mode_c = mode_c
         self.mode_h = mode_h
-
-    def search(self, start, goal, screen = None):
-        '''Performs search using Dijkstra's algorithm
-        Animates screen if screen is provided
+        self.indexed = indexed
+        self.queue = queue
+        self.corridors = corridors
+        self.stats = stats
+        self.counters = [] # Counting open lists of the current search
+
+    def options(self):
+        '''Returns the options that may change which path is found'''
+        return (self.indexed, self.queue, self.corridors)
+
+    def search(self, start, goal):
+        '''Finds path from start to goal without touching the board
+        Returns SearchResult, a list of (x, y) tuples, empty if there is no path
+        start: (x, y) tuple
+        goal: (x, y) tuple
+        '''
+        started = time.perf_counter()
+        self.counters = []
+        if self.board.connected(start, goal):
+            path = self.findPath(start, goal)
+        else:
+            path = []
+        return self.makeResult(path, time.perf_counter() - started)
+
+    def steps(self, start, goal):
+        '''Performs the same search as search(), as a resumable generator
+        Yields (EXPANDED, node) and (FRONTIER, node) events as the search runs,
+        then a final (FOUND, SearchResult) event, empty if there is no path
         start: (x, y) tuple
         goal: (x, y) tuple
         '''
+        self.counters = []
+        if not self.board.connected(start, goal):
+            return self.report(iter([(FOUND, [])]))
+        return self.report(self.findSteps(start, goal))
+
+    def findPath(self, start, goal):
+        '''Runs the selected search loop from start to goal, which are connected'''
+        return self.foundPath(self.findSteps(start, goal, False))
+
+    def findSteps(self, start, goal, events = True):
+        '''Returns the selected search generator from start to goal
+        events: yield every search event, otherwise only the final one
+        '''
+        if self.corridors:
+            return self.stepsCorridors(start, goal)
+        if self.indexed:
+            if self.bidirectional:
+                return self.stepsIndexedBD(start, goal, events)
+            return self.stepsIndexed(start, goal, events)
+        if self.bidirectional:
+            return self.stepsBD(start, goal, events)
+        return self.stepsUni(start, goal, events)
+
+    def report(self, events):
+        '''Passes search events on, turning the final path into a SearchResult
+        With stats enabled, elapsed time counts only time spent inside the
+        search, not time the caller spends between events
+        '''
+        if not self.stats:
+            for kind, data in events:
+                if kind == FOUND:
+                    data = self.makeResult(data)
+                yield kind, data
+            return
+
+        elapsed = 0
+        started = time.perf_counter()
+        for kind, data in events:
+            elapsed += time.perf_counter() - started
+            if kind == FOUND:
+                data = self.makeResult(data, elapsed)
+            yield kind, data
+            started = time.perf_counter()
+
+    def makeResult(self, path, elapsed = None):
+        '''Wraps path in a SearchResult, with counters if stats are enabled'''
+        result = SearchResult(path)
+        result.elapsed = elapsed
+        if self.stats:
+            result.pushes = sum(pq.pushes for pq in self.counters)
+            result.stalePops = sum(pq.stale for pq in self.counters)
+            result.expanded = sum(pq.pops for pq in self.counters) - result.stalePops
+            result.peakOpen = sum(pq.peak for pq in self.counters)
+            result.cost = self.pathCost(path) if path else math.inf
+        return result
+
+    def track(self, pq):
+        '''Returns open list pq, counting its operations if stats are enabled'''
+        if not self.stats:
+            return pq
+        if not isinstance(pq, CountingQueue):
+            pq = CountingQueue(pq)
+        pq.reset()
+        self.counters.append(pq)
+        return pq
+
+    def foundPath(self, events):
+        '''Runs search events through and returns the path of the final one'''
+        for kind, data in events:
+            if kind == FOUND:
+                return data
+
+    def stepsUni(self, start, goal, events = True):
+        '''Performs search from start to goal, keeping state in dicts
+        keyed by (x, y) tuples. Yields search events, or only the final
+        (FOUND, path) one if events is False
+        '''
         costs = {}
         prevs = {}
         costs[start] = 0
         prevs[start] = None
 
-        pq = PriorityQueue2()
+        pq = self.makeQueue()
         pq.enqueue(start, costs[start])
 
-        foundPath = False
         while not pq.isEmpty():
             cur = pq.dequeue()
-            cur_x, cur_y = cur
-
-            self.board[cur_y][cur_x] = 3 # Mark as "seen"
-            if screen:
-                self.board.draw_cell(cur_x, cur_y, screen)
-                self.board.draw_start(screen)
-
+            if events:
+                yield EXPANDED, cur
             if cur == goal:
-                foundPath = True
-                break
+                path = self.recreatePath(prevs, goal)
+                path.reverse()
+                yield FOUND, path
+                return
 
-            nbrs = self.board.getNeighbours(cur)
-            for nbr in nbrs:
-                turnCost = self.isTurn(prevs[cur], nbr) * 0.2
+            for nbr in self.board.getNeighbours(cur):
+                turnCost = self.isTurn(prevs[cur], nbr) * self.turnCost
                 cost2nbr = costs[cur] + self.getCost(cur, nbr, self.mode_c) + turnCost
                 if nbr not in costs or cost2nbr < costs[nbr]:
-                    # Mark as frontier
-                    self.board[nbr[1]][nbr[0]] = 4 
-
-                    if screen:
-                        self.board.draw_cell(nbr[0], nbr[1], screen)
-
                     # Relax costs if cost is lower
                     costs[nbr] = cost2nbr
                     prevs[nbr] = cur
-                    pq.enqueue(nbr, cost2nbr) # Multiple nodes possible!
-            if screen:
-                self.board.draw_start(screen)
-                self.board.draw_goal(screen)
-                screen.refresh()
-                time.sleep(0.001) # Slow down animation
-
-        # Recreate path
-        path = []
-        if foundPath:
-            path = [goal]
-            i, j = goal
-            while prevs[(i, j)]:
-                prev = prevs[(i, j)]
-                path.append(prev)
-                i, j = prev
-            return reversed(path)
+                    pq.enqueue(nbr, self.getPriority(cost2nbr, nbr[0], nbr[1], goal)) # Multiple nodes possible!
+                    if events:
+                        yield FRONTIER, nbr
+        yield FOUND, []
+
+    def stepsBD(self, start, goal, events = True):
+        '''Performs bidirectional search, alternating one expansion from
+        each side until the backward side reaches a node seen from the start.
+        Yields search events, or only the final one if events is False
+        '''
+        costs_s = {}
+        prevs_s = {}
+        costs_s[start] = 0
+        prevs_s[start] = None
+
+        costs_g = {}
+        prevs_g = {}
+        costs_g[goal] = 0
+        prevs_g[goal] = None
+
+        pq_s = self.makeQueue()
+        pq_s.enqueue(start, costs_s[start])
+
+        pq_g = self.makeQueue()
+        pq_g.enqueue(goal, costs_g[goal])
+
+        # Each side expands in turn: (queue, costs, prevs, target, priority)
+        sides = ((pq_s, costs_s, prevs_s, goal, self.getPriority),
+                 (pq_g, costs_g, prevs_g, start, self.getBackwardPriority))
+        while not pq_s.isEmpty() and not pq_g.isEmpty():
+            for pq, costs, prevs, target, getPriority in sides:
+                cur = pq.dequeue()
+                if events:
+                    yield EXPANDED, cur
+                if costs is costs_g and cur in costs_s:
+                    yield FOUND, self.joinPaths(prevs_s, prevs_g, cur)
+                    return
+
+                for nbr in self.board.getNeighbours(cur):
+                    turnCost = self.isTurn(prevs[cur], nbr) * self.turnCost
+                    cost2nbr = costs[cur] + self.getCost(cur, nbr, self.mode_c) + turnCost
+                    if nbr not in costs or cost2nbr < costs[nbr]:
+                        # Relax costs if cost is lower
+                        costs[nbr] = cost2nbr
+                        prevs[nbr] = cur
+                        pq.enqueue(nbr, getPriority(cost2nbr, nbr[0], nbr[1], target)) # Multiple nodes possible!
+                        if events:
+                            yield FRONTIER, nbr
+        yield FOUND, []
+
+    def recreatePath(self, prevs, node):
+        '''Walks prevs back from node to the root of its search
+        Returns list of (x, y) tuples, starting at node
+        '''
+        path = [node]
+        while prevs[node]:
+            node = prevs[node]
+            path.append(node)
         return path
 
+    def joinPaths(self, prevs_s, prevs_g, node):
+        '''Joins forward and backward search trees meeting at node'''
+        path = self.recreatePath(prevs_s, node)
+        path.reverse()
+        return path + self.recreatePath(prevs_g, node)[1:]
+
+    def stepsIndexed(self, start, goal, events = True):
+        '''Performs search over flat cell indices rather than (x, y) tuples
+        Costs live in an array('d') and parents in one direction byte per cell,
+        so the relaxation loop neither hashes nor allocates tuples.
+        Yields search events, or only the final one if events is False
+        start: (x, y) tuple
+        goal: (x, y) tuple
+        '''
+        board = self.board
+        grid = board.grid
+        stride = board.stride
+        offsets, steps = self.getSteps()
+        turnCost = self.turnCost
+        s = board.index(*start)
+        g = board.index(*goal)
+
+        costs = array('d', [math.inf]) * len(grid)
+        prevs = bytearray([UNSEEN]) * len(grid)
+        costs[s] = 0
+        prevs[s] = START
+
+        pq = self.makeQueue()
+        pq.enqueue(s, self.getPriority(0, start[0], start[1], goal))
+
+        while not pq.isEmpty():
+            cur = pq.dequeue()
+            if events:
+                y, x = divmod(cur, stride)
+                yield EXPANDED, (x-1, y-1)
+            if cur == g:
+                yield FOUND, self.tracePath(prevs, g)
+                return
+
+            cost = costs[cur]
+            prev = prevs[cur]
+            for k in range(4):
+                nbr = cur + offsets[k]
+                if grid[nbr] == 1:
+                    continue
+                cost2nbr = cost + steps[k]
+                if prev != START and (prev ^ k) & 1:
+                    cost2nbr += turnCost
+                if cost2nbr < costs[nbr]:
+                    costs[nbr] = cost2nbr
+                    prevs[nbr] = k
+                    y, x = divmod(nbr, stride)
+                    pq.enqueue(nbr, self.getPriority(cost2nbr, x-1, y-1, goal))
+                    if events:
+                        yield FRONTIER, (x-1, y-1)
+        yield FOUND, []
+
+    def stepsIndexedBD(self, start, goal, events = True):
+        '''Bidirectional version of stepsIndexed
+        Alternates one expansion from each side until the sides meet
+        start: (x, y) tuple
+        goal: (x, y) tuple
+        '''
+        board = self.board
+        grid = board.grid
+        stride = board.stride
+        offsets, steps = self.getSteps()
+        turnCost = self.turnCost
+        s = board.index(*start)
+        g = board.index(*goal)
+
+        costs_s = array('d', [math.inf]) * len(grid)
+        prevs_s = bytearray([UNSEEN]) * len(grid)
+        costs_s[s] = 0
+        prevs_s[s] = START
+
+        costs_g = array('d', [math.inf]) * len(grid)
+        prevs_g = bytearray([UNSEEN]) * len(grid)
+        costs_g[g] = 0
+        prevs_g[g] = START
+
+        pq_s = self.makeQueue()
+        pq_s.enqueue(s, 0)
+        pq_g = self.makeQueue()
+        pq_g.enqueue(g, 0)
+
+        # Each side expands in turn: (queue, costs, prevs, target, priority)
+        sides = ((pq_s, costs_s, prevs_s, goal, self.getPriority),
+                 (pq_g, costs_g, prevs_g, start, self.getBackwardPriority))
+        while not pq_s.isEmpty() and not pq_g.isEmpty():
+            for pq, costs, prevs, target, getPriority in sides:
+                cur = pq.dequeue()
+                if events:
+                    y, x = divmod(cur, stride)
+                    yield EXPANDED, (x-1, y-1)
+                if costs is costs_g and costs_s[cur] < math.inf:
+                    # Backward side reached a node seen from the start
+                    path = self.tracePath(prevs_s, cur)
+                    back = self.tracePath(prevs_g, cur)
+                    back.reverse()
+                    yield FOUND, path + back[1:]
+                    return
+
+                cost = costs[cur]
+                prev = prevs[cur]
+                for k in range(4):
+                    nbr = cur + offsets[k]
+                    if grid[nbr] == 1:
+                        continue
+                    cost2nbr = cost + steps[k]
+                    if prev != START and (prev ^ k) & 1:
+                        cost2nbr += turnCost
+                    if cost2nbr < costs[nbr]:
+                        costs[nbr] = cost2nbr
+                        prevs[nbr] = k
+                        y, x = divmod(nbr, stride)
+                        pq.enqueue(nbr, getPriority(cost2nbr, x-1, y-1, target))
+                        if events:
+                            yield FRONTIER, (x-1, y-1)
+        yield FOUND, []
+
+    def stepsCorridors(self, start, goal):
+        '''Performs search over the corridor graph, yielding events for
+        junctions only. Start and goal join the graph for this search,
+        splitting the corridors they lie in.
+        start: (x, y) tuple
+        goal: (x, y) tuple
+        '''
+        board = self.board
+        graph = self.getCorridors()
+        step = self.getSteps()[1][0] # Grid steps all cost the same
+        turnCost = self.turnCost
+        s = board.index(*start)
+        g = board.index(*goal)
+
+        # Temporary edges out of start, and into goal from its corridor's ends
+        extra = {}
+        if not graph.junction[s]:
+            extra[s] = graph.link(s, (s, g))
+        if not graph.junction[g]:
+            for end, first, last, steps, turns in graph.link(g, (s, g)):
+                extra.setdefault(end, []).append((g, last ^ 2, first ^ 2, steps, turns))
+
+        costs = {}
+        prevs = {} # Node: (previous node, first direction, last direction)
+        costs[s] = 0
+        prevs[s] = None
+
+        pq = self.makeQueue()
+        pq.enqueue(s, self.getPriority(0, start[0], start[1], goal))
+
+        while not pq.isEmpty():
+            cur = pq.dequeue()
+            yield EXPANDED, board.coords(cur)
+            if cur == g:
+                yield FOUND, self.expandCorridors(graph, prevs, g)
+                return
+
+            arrived = prevs[cur][2] if prevs[cur] is not None else START
+            for end, first, last, steps, turns in graph.edges.get(cur, []) + extra.get(cur, []):
+                cost2nbr = costs[cur] + steps * step + turns * turnCost
+                if arrived != START and (arrived ^ first) & 1:
+                    cost2nbr += turnCost
+                if end not in costs or cost2nbr < costs[end]:
+                    # Relax costs if cost is lower
+                    costs[end] = cost2nbr
+                    prevs[end] = (cur, first, last)
+                    x, y = board.coords(end)
+                    pq.enqueue(end, self.getPriority(cost2nbr, x, y, goal)) # Multiple nodes possible!
+                    yield FRONTIER, (x, y)
+        yield FOUND, []
+
+    def expandCorridors(self, graph, prevs, g):
+        '''Recreates full path of (x, y) tuples ending at corridor graph node g'''
+        legs = []
+        node = g
+        while prevs[node] is not None:
+            prev, first, _ = prevs[node]
+            legs.append((prev, first, node))
+            node = prev
+        legs.reverse()
+
+        path = [node]
+        for prev, first, node in legs:
+            path += graph.expand(prev, first, node)
+            path.append(node)
+        return [self.board.coords(i) for i in path]
+
+    def getCorridors(self):
+        '''Returns the board's corridor graph, built or rebuilt as needed'''
+        graph = self.board.corridors
+        if graph is None:
+            graph = self.board.corridors = CorridorGraph(self.board)
+        graph.refresh()
+        return graph
+
+    def getSteps(self):
+        '''Returns flat index offsets and step costs for each direction'''
+        offsets = []
+        steps = []
+        for dx, dy, offset in self.board.nbrOffsets:
+            offsets.append(offset)
+            steps.append(self.getCost((0, 0), (dx, dy), self.mode_c))
+        return offsets, steps
+
+    def tracePath(self, prevs, i):
+        '''Recreates path of (x, y) tuples ending at flat index i
+        by walking parent direction codes back to the start
+        '''
+        offsets = [offset for _, _, offset in self.board.nbrOffsets]
+        path = [i]
+        while prevs[i] != START:
+            i -= offsets[prevs[i]]
+            path.append(i)
+        path.reverse()
+        return [self.board.coords(i) for i in path]
+
+    def getPriority(self, cost, x, y, target):
+        '''Priority of cell (x, y) on the open list, given its path cost'''
+        return cost
+
+    def getBackwardPriority(self, cost, x, y, target):
+        '''Priority of cell (x, y) on the backward open list of
+        a bidirectional search, whose target is the start
+        '''
+        return self.getPriority(cost, x, y, target)
+
+    def makeQueue(self):
+        '''Creates an open list of the selected queue class
+        Bucket queues need every priority to be integral once scaled,
+        so fall back to a binary heap when they are not
+        '''
+        if issubclass(self.queue, BucketQueue):
+            if not self.isIntegral():
+                return self.track(PriorityQueue2())
+            return self.track(self.queue(self.bucketScale))
+        return self.track(self.queue())
+
+    def isIntegral(self):
+        '''Returns TRUE if every priority is an integer once scaled by bucketScale'''
+        return self.mode_c == 0
+
     def getCost(self, node1, node2, mode = 0):
         '''Finds distance between node1 and node2
         node1: (x, y) tuple
@@ -83,6 +510,17 @@ class Dijkstra:
             return (abs(node1[0] - node2[0])**2 
                     + abs(node1[1] - node2[1])**2)**(1/2)
 
+    def pathCost(self, path):
+        '''Finds total cost of path, including turn costs
+        path: list of (x, y) tuples
+        '''
+        cost = 0
+        for k in range(1, len(path)):
+            cost += self.getCost(path[k-1], path[k], self.mode_c)
+            if k > 1:
+                cost += self.isTurn(path[k-2], path[k]) * self.turnCost
+        return cost
+
     def isTurn(self, node1, node2):
         '''Finds if nodes lie on same line. If not, there's a turn'''
         if node1 is None or node2 is None:
@@ -92,79 +530,36 @@ class Dijkstra:
         return 1
 
 class AStar(Dijkstra):
-    def search(self, start, goal, screen = None):
-        '''Performs search using AStar algorithm
-        Animates screen if screen is provided
-        start: (x, y) tuple
-        goal: (x, y) tuple
-        '''
-        scores = {}
-        prevs = {}
-        scores[start] = 0
-        prevs[start] = None
+    def getPriority(self, cost, x, y, target):
+        '''Priority of cell (x, y) on the open list, given its path cost'''
+        return cost + self.getHeuristic((x, y), target, self.mode_h)
 
-        pq = PriorityQueue2()
-        pq.enqueue(start, scores[start])
-
-        foundPath = False
-        while not pq.isEmpty():
-            cur = pq.dequeue()
-            cur_x, cur_y = cur
-
-            # Mark as seen
-            self.board[cur_y][cur_x] = 3
-            if screen:
-                self.board.draw_cell(cur_x, cur_y, screen)
-                self.board.draw_start(screen)
-
-            if cur == goal: 
-                foundPath = True
-                break 
-
-            nbrs = self.board.getNeighbours(cur)
-            for nbr in nbrs:
-                cost = (self.getCost(cur, nbr, self.mode_c) + self.isTurn(prevs[cur], nbr) * 0.2)
-                heuristic = (self.getHeuristic(nbr, goal, self.mode_h))
-                score2nbr = scores[cur] + cost
-                if nbr not in scores or score2nbr < scores[nbr]:
-                    # Mark as "frontier"
-                    self.board[nbr[1]][nbr[0]] = 4
-                    if screen:
-                        self.board.draw_cell(nbr[0], nbr[1], screen)
-
-                    # Relax costs
-                    scores[nbr] = score2nbr
-                    prevs[nbr] = cur
-                    pq.enqueue(nbr, score2nbr + heuristic) # Multiple nodes possible!
-            if screen:
-                self.board.draw_start(screen)
-                self.board.draw_goal(screen)
-                screen.refresh()
-                time.sleep(0.001) # Slow down animation
-
-        # Recreate path
-        path = []
-        if foundPath:
-            path = [goal]
-            i, j = goal
-            while prevs[(i, j)]:
-                prev = prevs[(i, j)]
-                path.append(prev)
-                i, j = prev
-            return reversed(path)
-        return path
+    def isIntegral(self):
+        '''Returns TRUE if every priority is an integer once scaled by bucketScale'''
+        return self.mode_c == 0 and self.mode_h != 1
 
     def getHeuristic(self, node1, node2, mode = 0):
         '''Finds manhattan distance between node1 and node2
         node1: (x, y) tuple
         node2: (x, y) tuple
-        mode: 0 - Manhattan, 1 - Euclidean
+        mode: 0 - Manhattan, 1 - Euclidean, 2 - Landmarks (ALT)
         '''
         if mode == 0:
             return abs(node1[0] - node2[0]) + abs(node1[1] - node2[1])
         elif mode == 1:
             return (abs(node1[0] - node2[0])**2 
                     + abs(node1[1] - node2[1])**2)**(1/2)
+        elif mode == 2:
+            board = self.board
+            return self.getLandmarks().estimate(board.index(*node1), board.index(*node2))
+
+    def getLandmarks(self):
+        '''Returns the board's landmark table, built or rebuilt as needed'''
+        table = self.board.landmarks
+        if table is None:
+            table = self.board.landmarks = LandmarkTable(self.board)
+        table.refresh()
+        return table
 
     def cross(self, node1, node2, node3):
         '''Calculates vector cross-product between node1 and node3, 
@@ -179,363 +574,571 @@ class AStar(Dijkstra):
 
 
 class Greedy(AStar):
-    def search(self, start, goal, screen = None):
-        '''Performs greedy search
-        Animates screen if screen is provided
-        start: (x, y) tuple
-        goal: (x, y) tuple
-        '''
-        scores = {}
-        prevs = {}
-        scores[start] = 0
-        prevs[start] = None
+    suboptimality = math.inf # Ignores path cost altogether
+    def getPriority(self, cost, x, y, target):
+        '''Priority of cell (x, y) on the open list, given its path cost'''
+        return self.getHeuristic((x, y), target, self.mode_h)
 
-        pq = PriorityQueue2()
-        pq.enqueue(start, scores[start])
+    def isIntegral(self):
+        '''Returns TRUE if every priority is an integer once scaled by bucketScale'''
+        return self.mode_h != 1
 
-        foundPath = False
-        while not pq.isEmpty():
-            cur = pq.dequeue()
-            cur_x, cur_y = cur
-
-            self.board[cur_y][cur_x] = 3 # Mark as "seen"
-            if screen:
-                self.board.draw_cell(cur_x, cur_y, screen)
 
-            if cur == goal:
-                foundPath = True
-                break
-
-            nbrs = self.board.getNeighbours(cur)
-            for nbr in nbrs:
-                cost = self.getCost(cur, nbr, self.mode_c) + self.isTurn(prevs[cur], nbr)
-                heuristic = self.getHeuristic(nbr, goal, self.mode_h)
-                score2nbr = scores[cur] + cost
-                if nbr not in scores or score2nbr < scores[nbr]:
-                    # Mark as frontier
-                    self.board[nbr[1]][nbr[0]] = 4
-                    if screen:
-                        self.board.draw_cell(nbr[0], nbr[1], screen)
-                    
-                    # Relax costs if cost is lower
-                    scores[nbr] = score2nbr
-                    prevs[nbr] = cur
-                    pq.enqueue(nbr, heuristic) # Multiple nodes possible!
-            if screen:
-                self.board.draw_start(screen)
-                self.board.draw_goal(screen)
-                screen.refresh()
-                time.sleep(0.001) # Slow down animation
-
-        # Recreate path
-        path = []
-        if foundPath:
-            path = [goal]
-            i, j = goal
-            while prevs[(i, j)]:
-                prev = prevs[(i, j)]
-                path.append(prev)
-                i, j = prev
-            return reversed(path)
-        return path
+class DijkstraBD(Dijkstra):
+    bidirectional = True
+    suboptimality = math.inf # Stops at the first cell both sides reach
 
 
-class DijkstraBD(Dijkstra):
-    def search(self, start, goal, screen = None):
-        '''Performs search using Dijkstra's algorithm
-        Animates screen if screen is provided
-        start: (x, y) tuple
-        goal: (x, y) tuple
-        '''
-        costs_s = {}
-        prevs_s = {}
-        costs_s[start] = 0
-        prevs_s[start] = None
+class AStarBD(AStar):
+    bidirectional = True
+    suboptimality = math.inf # Stops at the first cell both sides reach
 
-        costs_g = {}
-        prevs_g = {}
-        costs_g[goal] = 0
-        prevs_g[goal] = None
+    def getBackwardPriority(self, cost, x, y, target):
+        '''Slightly discounted heuristic on the backward side'''
+        return cost + self.getHeuristic((x, y), target, self.mode_h) * 0.999
 
-        pq_s = PriorityQueue2()
-        pq_s.enqueue(start, costs_s[start])
+    def isIntegral(self):
+        '''Backward heuristic is scaled by 0.999, so never integral'''
+        return False
 
-        pq_g = PriorityQueue2()
-        pq_g.enqueue(goal, costs_g[goal])
 
-        foundPath = False
-        while not pq_s.isEmpty() and not pq_g.isEmpty():
-            cur = pq_s.dequeue()
-            cur_x, cur_y = cur
-
-            # Mark as seen
-            self.board[cur_y][cur_x] = 3
-            if screen:
-                 self.board.draw_cell(cur_x, cur_y, screen)
-
-            nbrs = self.board.getNeighbours(cur)
-            for nbr in nbrs:
-                turnCost = self.isTurn(prevs_s[cur], nbr) * 0.2
-                cost2nbr = costs_s[cur] + self.getCost(cur, nbr, self.mode_c) + turnCost
-                if nbr not in costs_s or cost2nbr < costs_s[nbr]:
-                    # Mark as frontier
-                    self.board[nbr[1]][nbr[0]] = 4 
-                    if screen:
-                        self.board.draw_cell(nbr[0], nbr[1], screen)
+class GreedyBD(Greedy):
+    bidirectional = True
 
-                    # Relax costs if cost is lower
-                    costs_s[nbr] = cost2nbr
-                    prevs_s[nbr] = cur
-                    pq_s.enqueue(nbr, cost2nbr) # Multiple nodes possible!
-
-            cur = pq_g.dequeue()
-            cur_x, cur_y = cur
-
-            # Mark as seen
-            self.board[cur_y][cur_x] = 3
-            if screen:
-                self.board.draw_cell(cur_x, cur_y, screen)
-
-            if cur in costs_s:
-                foundPath = True
-                break
-
-            nbrs = self.board.getNeighbours(cur)
-            for nbr in nbrs:
-                turnCost = self.isTurn(prevs_g[cur], nbr) * 0.2
-                cost2nbr = costs_g[cur] + self.getCost(cur, nbr, self.mode_c) + turnCost
-                if nbr not in costs_g or cost2nbr < costs_g[nbr]:
-                    # Mark as frontier
-                    self.board[nbr[1]][nbr[0]] = 4
-                    if screen:
-                        self.board.draw_cell(nbr[0], nbr[1], screen)
 
-                    # Relax costs
-                    costs_g[nbr] = cost2nbr
-                    prevs_g[nbr] = cur
-                    pq_g.enqueue(nbr, cost2nbr) # Multiple nodes possible!
-
-            if screen:
-                self.board.draw_start(screen)
-                self.board.draw_goal(screen)
-                screen.refresh()
-                time.sleep(0.001) # Slow down animation
-
-        # Recreate path
-        path = []
-        if foundPath:
-            path = [cur]
-            i, j = cur
-            while prevs_s[(i, j)]:
-                prev = prevs_s[(i, j)]
-                path.append(prev)
-                i, j = prev
-            path = list(reversed(path))
-
-            i, j = cur
-            while prevs_g[(i, j)]:
-                prev = prevs_g[(i, j)]
-                path.append(prev)
-                i, j = prev
-            return path
-        return path
+class NBAStar(AStar):
+    bidirectional = True
+    corridorSearch = False
 
-class AStarBD(AStar):
-    def search(self, start, goal, screen = None):
-        '''Performs bidirectional search using AStar algorithm
-        Animates screen if screen is provided
+    def findPath(self, start, goal):
+        '''Performs New Bidirectional A* (Pijls and Post).
+        Each step expands the side with the smaller open list. Nodes are
+        closed for both sides at once, and a node whose f-value, or cost plus
+        the other side's lowest f-value minus its heuristic towards the
+        other end, is no better than the best meeting cost is not expanded.
+        The search stops once either side has nothing left below that cost.
+        Needs a consistent heuristic, which every mode_h provides.
         start: (x, y) tuple
         goal: (x, y) tuple
-        screen: curses.window object
         '''
-        costs_s = {}
-        prevs_s = {}
-        costs_s[start] = 0
-        prevs_s[start] = None
-
-        costs_g = {}
-        prevs_g = {}
-        costs_g[goal] = 0
-        prevs_g[goal] = None
+        return self.foundPath(self.findSteps(start, goal))
+
+    def findSteps(self, start, goal):
+        '''Generator version of search, yielding search events'''
+        board = self.board
+        if start == goal:
+            yield FOUND, [start]
+            return
+        grid = board.grid
+        stride = board.stride
+        offsets, steps = self.getSteps()
+        turnCost = self.turnCost
+        s = board.index(*start)
+        g = board.index(*goal)
+
+        costs_s = array('d', [math.inf]) * len(grid)
+        prevs_s = bytearray([UNSEEN]) * len(grid)
+        costs_s[s] = 0
+        prevs_s[s] = START
+
+        costs_g = array('d', [math.inf]) * len(grid)
+        prevs_g = bytearray([UNSEEN]) * len(grid)
+        costs_g[g] = 0
+        prevs_g[g] = START
+
+        closed = bytearray(len(grid)) # Expanded or pruned, from either side
+
+        # Ties go to the deeper node, which is nearer the other side. Heaps
+        # compare (f, -cost) directly; a bucket holds equal f-values only and
+        # pops the newest first, which favours deeper nodes already
+        if issubclass(self.queue, BucketQueue) and self.isIntegral():
+            key = lambda f, cost: f
+        else:
+            key = lambda f, cost: (f, -cost)
+
+        pq_s = self.makeQueue()
+        pq_s.enqueue(s, key(self.getPriority(0, start[0], start[1], goal), 0))
+        pq_g = self.makeQueue()
+        pq_g.enqueue(g, key(self.getPriority(0, goal[0], goal[1], start), 0))
+
+        best = math.inf # Cheapest path found through a meeting node
+        meet = None
+        # Lowest f-value on each side's open list, forward then backward
+        lowest = [self.getPriority(0, start[0], start[1], goal),
+                  self.getPriority(0, goal[0], goal[1], start)]
+
+        # (side, queue, costs, prevs, other costs, other prevs, target, origin)
+        sides = ((0, pq_s, costs_s, prevs_s, costs_g, prevs_g, goal, start),
+                 (1, pq_g, costs_g, prevs_g, costs_s, prevs_s, start, goal))
+        while not pq_s.isEmpty() and not pq_g.isEmpty():
+            side, pq, costs, prevs, others, otherPrevs, target, origin = \
+                sides[0] if len(pq_s) <= len(pq_g) else sides[1]
+            cur = pq.dequeue()
+            if closed[cur]:
+                continue # Stale duplicate
+            closed[cur] = 1
+
+            cost = costs[cur]
+            y, x = divmod(cur, stride)
+            f = self.getPriority(cost, x-1, y-1, target)
+            if f >= best:
+                break # Nothing left on this side can beat the best path
+            lowest[side] = f
+
+            # Prune: no path through cur can be cheaper than the best one
+            if cost + lowest[1 - side] - self.getHeuristic((x-1, y-1), origin, self.mode_h) >= best:
+                continue
+            yield EXPANDED, (x-1, y-1)
+
+            prev = prevs[cur]
+            for k in range(4):
+                nbr = cur + offsets[k]
+                if grid[nbr] == 1 or closed[nbr]:
+                    continue
+                cost2nbr = cost + steps[k]
+                if prev != START and (prev ^ k) & 1:
+                    cost2nbr += turnCost
+                if cost2nbr < costs[nbr]:
+                    costs[nbr] = cost2nbr
+                    prevs[nbr] = k
+                    ny, nx = divmod(nbr, stride)
+                    pq.enqueue(nbr, key(self.getPriority(cost2nbr, nx-1, ny-1, target),
+                                        cost2nbr))
+                    yield FRONTIER, (nx-1, ny-1)
+
+                    if others[nbr] < math.inf:
+                        # Both sides have reached nbr: a candidate path
+                        total = cost2nbr + others[nbr]
+                        if otherPrevs[nbr] != START and (otherPrevs[nbr] ^ k) & 1:
+                            total += turnCost
+                        if total < best:
+                            best = total
+                            meet = nbr
+
+        if meet is None:
+            yield FOUND, []
+            return
+        path = self.tracePath(prevs_s, meet)
+        back = self.tracePath(prevs_g, meet)
+        back.reverse()
+        yield FOUND, path + back[1:]
+
+
+class JPS(AStar):
+    # Shortest in steps, but not in turns: the canonical ordering keeps only
+    # horizontal-first paths, which can need several more turns than the best
+    suboptimality = math.inf
+    corridorSearch = False
+
+    def findPath(self, start, goal):
+        '''Performs Jump Point Search, for uniform-cost 4-connected grids
+        Symmetric paths are pruned with a horizontal-first canonical ordering:
+        vertical moves may only turn horizontal at forced neighbours, so only
+        jump points are ever put on the open list.
+        Paths are shortest in steps, but with turn costs they may cost more
+        than the cheapest, as the pruned symmetric paths include the ones
+        with fewest turns.
+        start: (x, y) tuple
+        goal: (x, y) tuple
+        '''
+        return self.foundPath(self.findSteps(start, goal))
 
-        pq_s = PriorityQueue2()
-        pq_s.enqueue(start, costs_s[start])
+    def findSteps(self, start, goal):
+        '''Generator version of search, yielding events for jump points'''
+        board = self.board
+        s = board.index(*start)
+        g = board.index(*goal)
 
-        pq_g = PriorityQueue2()
-        pq_g.enqueue(goal, costs_g[goal])
+        scores = {}
+        prevs = {}
+        scores[s] = 0
+        prevs[s] = None
 
-        foundPath = False
-        while not pq_s.isEmpty() and not pq_g.isEmpty():
-            cur = pq_s.dequeue()
-            cur_x, cur_y = cur
-
-            # Mark as seen
-            self.board[cur_y][cur_x] = 3
-            if screen:
-                self.board.draw_cell(cur_x, cur_y, screen)
-
-            nbrs = self.board.getNeighbours(cur)
-            for nbr in nbrs:
-                turnCost = self.isTurn(prevs_s[cur], nbr) * 0.2
-                cost2nbr = costs_s[cur] + self.getCost(cur, nbr, self.mode_c) + turnCost
-                heuristic = self.getHeuristic(nbr, goal, self.mode_h)
-                if nbr not in costs_s or cost2nbr < costs_s[nbr]:
-                    # Mark as frontier
-                    self.board[nbr[1]][nbr[0]] = 4
-                    if screen:
-                        self.board.draw_cell(nbr[0], nbr[1], screen)
-                    
-                    # Relax costs if cost is lower
-                    costs_s[nbr] = cost2nbr
-                    prevs_s[nbr] = cur
-                    pq_s.enqueue(nbr, cost2nbr + heuristic) # Multiple nodes possible!
-
-            cur = pq_g.dequeue()
-            cur_x, cur_y = cur
-
-            self.board[cur_y][cur_x] = 3 # Mark as "seen"
-            if screen:
-                self.board.draw_cell(cur_x, cur_y, screen)
-
-            if cur in costs_s:
-                foundPath = True
-                break
-
-            nbrs = self.board.getNeighbours(cur)
-            for nbr in nbrs:
-                turnCost = self.isTurn(prevs_g[cur], nbr) * 0.2
-                cost2nbr = costs_g[cur] + self.getCost(cur, nbr, self.mode_c) + turnCost
-                heuristic = self.getHeuristic(nbr, start, self.mode_h)
-                if nbr not in costs_g or cost2nbr < costs_g[nbr]:
-                    self.board[nbr[1]][nbr[0]] = 4 # Mark as "frontier"
-                    if screen:
-                        self.board.draw_cell(nbr[0], nbr[1], screen)
+        pq = self.makeQueue()
+        pq.enqueue(s, scores[s])
 
+        while not pq.isEmpty():
+            cur = pq.dequeue()
+            cur_xy = board.coords(cur)
+            yield EXPANDED, cur_xy
+
+            if cur == g:
+                yield FOUND, self.fillPath(prevs, g)
+                return
+
+            prev = prevs[cur]
+            prev_xy = board.coords(prev) if prev is not None else None
+            for nbr in self.getJumpPoints(cur, prev, g):
+                nbr_xy = board.coords(nbr)
+                cost = (self.getCost(cur_xy, nbr_xy, self.mode_c)
+                        + self.isTurn(prev_xy, nbr_xy) * self.turnCost)
+                heuristic = self.getHeuristic(nbr_xy, goal, self.mode_h)
+                score2nbr = scores[cur] + cost
+                if nbr not in scores or score2nbr < scores[nbr]:
                     # Relax costs
-                    costs_g[nbr] = cost2nbr
-                    prevs_g[nbr] = cur
-                    pq_g.enqueue(nbr, cost2nbr + heuristic * 0.999) # Multiple nodes possible!
-
-            if screen:
-                self.board.draw_start(screen)
-                self.board.draw_goal(screen)
-                screen.refresh()
-                time.sleep(0.001) # Slow down animation
-
-        # Recreate path
-        path = []
-        if foundPath:
-            path = [cur]
-            i, j = cur
-            while prevs_s[(i, j)]:
-                prev = prevs_s[(i, j)]
-                path.append(prev)
-                i, j = prev
-            path = list(reversed(path))
-
-            i, j = cur
-            while prevs_g[(i, j)]:
-                prev = prevs_g[(i, j)]
-                path.append(prev)
-                i, j = prev
-            return path
+                    scores[nbr] = score2nbr
+                    prevs[nbr] = cur
+                    pq.enqueue(nbr, score2nbr + heuristic) # Multiple nodes possible!
+                    yield FRONTIER, nbr_xy
+        yield FOUND, []
+
+    def fillPath(self, prevs, i):
+        '''Recreates path ending at flat index i, filling in the straight
+        runs between jump points
+        '''
+        board = self.board
+        path = [board.coords(i)]
+        while prevs[i] is not None:
+            prev = prevs[i]
+            step = self.getDirection(prev, i)
+            while i != prev:
+                i -= step
+                path.append(board.coords(i))
+        path.reverse()
         return path
 
+    def getJumpPoints(self, cur, prev, goal):
+        '''Finds successor jump points of cur, pruning by arrival direction
+        cur, prev, goal: flat grid indices (prev is None at the start)
+        '''
+        grid = self.board.grid
+        stride = self.board.stride
+        if prev is None:
+            # Start node: scan every direction
+            jumps = [self.jumpHorizontal(cur, 1, goal),
+                     self.jumpHorizontal(cur, -1, goal),
+                     self.jumpVertical(cur, stride, goal),
+                     self.jumpVertical(cur, -stride, goal)]
+        else:
+            step = self.getDirection(prev, cur)
+            if step in (1, -1):
+                # Horizontal arrival: carry on, vertical turns are natural
+                jumps = [self.jumpHorizontal(cur, step, goal),
+                         self.jumpVertical(cur, stride, goal),
+                         self.jumpVertical(cur, -stride, goal)]
+            else:
+                # Vertical arrival: carry on, turn only into forced neighbours
+                jumps = [self.jumpVertical(cur, step, goal)]
+                for side in (1, -1):
+                    if grid[cur + side] != 1 and grid[cur - step + side] == 1:
+                        jumps.append(self.jumpHorizontal(cur, side, goal))
+        return [jump for jump in jumps if jump is not None]
+
+    def jumpHorizontal(self, i, step, goal):
+        '''Scans horizontally from flat index i until a jump point is found
+        A cell is a jump point if a vertical scan from it finds one
+        Returns flat index of jump point, or None if a wall is hit first
+        '''
+        grid = self.board.grid
+        stride = self.board.stride
+        while True:
+            i += step
+            if grid[i] == 1:
+                return None
+            if i == goal:
+                return i
+            if (self.jumpVertical(i, stride, goal) is not None
+                    or self.jumpVertical(i, -stride, goal) is not None):
+                return i
+
+    def jumpVertical(self, i, step, goal):
+        '''Scans vertically from flat index i until a jump point is found
+        A cell is a jump point if it has a forced horizontal neighbour
+        Returns flat index of jump point, or None if a wall is hit first
+        '''
+        grid = self.board.grid
+        while True:
+            n = i + step
+            if grid[n] == 1:
+                return None
+            if n == goal:
+                return n
+            if ((grid[n + 1] != 1 and grid[i + 1] == 1)
+                    or (grid[n - 1] != 1 and grid[i - 1] == 1)):
+                return n
+            i = n
+
+    def getDirection(self, node1, node2):
+        '''Finds unit flat index step from node1 towards node2,
+        which must lie on the same row or column
+        '''
+        if abs(node2 - node1) < self.board.stride:
+            return 1 if node2 > node1 else -1
+        return self.board.stride if node2 > node1 else -self.board.stride
+
 
-class GreedyBD(Greedy):
-    def search(self, start, goal, screen = None):
-        '''Performs bidirectional greedy search
+class LPAStar(AStar):
+    suboptimality = math.inf # Blind to turn costs
+    corridorSearch = False
+    turnBlind = True
+
+    def __init__(self, board, mode_c, mode_h, **options):
+        '''Lifelong Planning A*, which keeps its search state between searches
+        and repairs only the part changed by wall edits since the last one.
+        Step costs only: turn costs depend on the path taken, which LPA*'s
+        per-cell state cannot represent.
+        '''
+        super().__init__(board, mode_c, mode_h, **options)
+        self.reset(None, None)
+
+    def reset(self, start, goal):
+        '''Discards search state, ready to search from start to goal'''
+        n = len(self.board.grid)
+        self.start = start
+        self.goal = goal
+        self.g = array('d', [math.inf]) * n
+        self.rhs = array('d', [math.inf]) * n
+        self.pq = self.track(IndexedPriorityQueue())
+        self.mark = self.board.editMark()
+        self.offsets, self.costs = self.getSteps()
+        if start is not None:
+            s = self.board.index(*start)
+            self.rhs[s] = 0
+            self.pq.enqueue(s, self.getKey(s))
+
+    def findPath(self, start, goal):
+        '''Finds path from start to goal, reusing the previous search if
+        only walls have changed since
         start: (x, y) tuple
         goal: (x, y) tuple
         '''
-        costs_s = {}
-        prevs_s = {}
-        costs_s[start] = 0
-        prevs_s[start] = None
-
-        costs_g = {}
-        prevs_g = {}
-        costs_g[goal] = 0
-        prevs_g[goal] = None
-
-        pq_s = PriorityQueue2()
-        pq_s.enqueue(start, costs_s[start])
+        return self.foundPath(self.findSteps(start, goal))
+
+    def findSteps(self, start, goal):
+        '''Generator version of search, yielding only the cells repaired'''
+        edits = self.board.editsSince(self.mark)
+        if start != self.start or goal != self.goal or edits is None:
+            self.reset(start, goal)
+        else:
+            self.pq = self.track(self.pq)
+            self.update(edits)
+            self.mark = self.board.editMark()
+
+        grid = self.board.grid
+        g = self.g
+        pq = self.pq
+        goal_i = self.board.index(*goal)
+        while not pq.isEmpty() and (pq.topPriority() < self.getKey(goal_i)
+                                    or self.rhs[goal_i] != g[goal_i]):
+            u = pq.dequeue()
+            yield EXPANDED, self.board.coords(u)
+            if g[u] > self.rhs[u]:
+                # Overconsistent: settle cost, then let neighbours use it
+                g[u] = self.rhs[u]
+            else:
+                # Underconsistent: cost went up, so redo u and its neighbours
+                g[u] = math.inf
+                self.updateVertex(u)
+            for offset in self.offsets:
+                if grid[u + offset] != 1:
+                    self.updateVertex(u + offset)
+
+        yield FOUND, self.extractPath()
+
+    def update(self, cells):
+        '''Repairs search state after walls were added or removed
+        cells: list of (x, y) tuples
+        '''
+        grid = self.board.grid
+        for cell in cells:
+            i = self.board.index(*cell)
+            self.updateVertex(i)
+            for offset in self.offsets:
+                if grid[i + offset] != 1:
+                    self.updateVertex(i + offset)
+
+    def updateVertex(self, u):
+        '''Recomputes rhs (one-step lookahead cost) of flat index u
+        and requeues it if it is no longer consistent
+        '''
+        grid = self.board.grid
+        if u != self.board.index(*self.start):
+            best = math.inf
+            if grid[u] != 1:
+                for k, offset in enumerate(self.offsets):
+                    if grid[u - offset] != 1:
+                        cost = self.g[u - offset] + self.costs[k]
+                        if cost < best:
+                            best = cost
+            self.rhs[u] = best
+        if self.pq.contains(u):
+            self.pq.remove(u)
+        if self.g[u] != self.rhs[u]:
+            self.pq.enqueue(u, self.getKey(u))
+
+    def getKey(self, u):
+        '''Returns LPA* priority (f, g) of flat index u'''
+        cost = min(self.g[u], self.rhs[u])
+        y, x = divmod(u, self.board.stride)
+        # Landmark tables are rebuilt after edits, which would change keys
+        # already queued, so fall back to Manhattan
+        mode_h = 0 if self.mode_h == 2 else self.mode_h
+        return (cost + self.getHeuristic((x-1, y-1), self.goal, mode_h), cost)
+
+    def extractPath(self):
+        '''Follows cheapest predecessors back from goal to start'''
+        board = self.board
+        grid = board.grid
+        s = board.index(*self.start)
+        i = board.index(*self.goal)
+        if grid[s] == 1 or grid[i] == 1 or self.g[i] == math.inf:
+            return []
+
+        path = [i]
+        while i != s:
+            best = None
+            for k, offset in enumerate(self.offsets):
+                p = i - offset
+                if grid[p] != 1 and (best is None
+                                     or self.g[p] + self.costs[k] < self.g[best] + self.costs[bestK]):
+                    best = p
+                    bestK = k
+            if best is None or self.g[best] == math.inf or len(path) > len(grid):
+                return []
+            i = best
+            path.append(i)
+        path.reverse()
+        return [board.coords(i) for i in path]
+
+
+class HPAStar(AStar):
+    clusterSize = 16
+    suboptimality = math.inf # Paths must pass through cluster entrances
+    corridorSearch = False
+    turnBlind = True
+
+    def __init__(self, board, mode_c, mode_h, clusterSize = None, workers = 1, **options):
+        '''Hierarchical A*: searches an abstract graph of cluster entrances,
+        then refines each abstract edge into cells within one cluster.
+        Paths are near-optimal rather than optimal, and count steps only.
+        clusterSize: cluster width and height in cells
+        workers: processes used to preprocess clusters (None for CPU count)
+        '''
+        super().__init__(board, mode_c, mode_h, **options)
+        self.graph = ClusterGraph(board, clusterSize or self.clusterSize, workers)
 
-        pq_g = PriorityQueue2()
-        pq_g.enqueue(goal, costs_g[goal])
+    def options(self):
+        '''Returns the options that may change which path is found'''
+        return super().options() + (self.graph.size,)
 
-        foundPath = False
-        while not pq_s.isEmpty() and not pq_g.isEmpty():
-            cur = pq_s.dequeue()
-            cur_x, cur_y = cur
-
-            self.board[cur_y][cur_x] = 3 # Mark as "seen"
-            if screen:
-                self.board.draw_cell(cur_x, cur_y, screen)
-
-            nbrs = self.board.getNeighbours(cur)
-            for nbr in nbrs:
-                turnCost = self.isTurn(prevs_s[cur], nbr) * 0.2
-                cost2nbr = costs_s[cur] + self.getCost(cur, nbr, self.mode_c) + turnCost
-                heuristic = self.getHeuristic(nbr, goal, self.mode_h)
-                if nbr not in costs_s or cost2nbr < costs_s[nbr]:
-                    # Relax costs if cost is lower
-                    self.board[nbr[1]][nbr[0]] = 4 # Mark as "frontier"
-                    if screen:
-                        self.board.draw_cell(nbr[0], nbr[1], screen)
+    def findPath(self, start, goal):
+        '''Finds path from start to goal through the cluster graph
+        start: (x, y) tuple
+        goal: (x, y) tuple
+        '''
+        return self.foundPath(self.findSteps(start, goal))
+
+    def findSteps(self, start, goal):
+        '''Generator version of search, yielding events for abstract nodes'''
+        board = self.board
+        graph = self.graph
+        graph.refresh()
+        s = board.index(*start)
+        g = board.index(*goal)
+
+        # Start and goal join the graph only for this search
+        startEdges, startCosts = graph.connect(s)
+        goalEdges, _ = graph.connect(g)
+        if g in startCosts:
+            startEdges[g] = startCosts[g]
+
+        costs = {s: 0}
+        prevs = {s: None}
+        pq = self.makeQueue()
+        pq.enqueue(s, self.getPriority(0, start[0], start[1], goal))
 
-                    # Relax costs
-                    costs_s[nbr] = cost2nbr
-                    prevs_s[nbr] = cur
-                    pq_s.enqueue(nbr,heuristic) # Multiple nodes possible!
-
-            cur = pq_g.dequeue()
-            cur_x, cur_y = cur
-
-            self.board[cur_y][cur_x] = 3 # Mark as "seen"
-            if screen:
-                self.board.draw_cell(cur_x, cur_y, screen)
-
-            if cur in costs_s:
-                foundPath = True
-                break
-
-            nbrs = self.board.getNeighbours(cur)
-            for nbr in nbrs:
-                turnCost = self.isTurn(prevs_g[cur], nbr) * 0.2
-                cost2nbr = costs_g[cur] + self.getCost(cur, nbr, self.mode_c) + turnCost
-                heuristic = self.getHeuristic(nbr, start, self.mode_h)
-                if nbr not in costs_g or cost2nbr < costs_g[nbr]: # Relax costs if cost is lower
-                    self.board[nbr[1]][nbr[0]] = 4 # Mark as "frontier"
-                    if screen:
-                        self.board.draw_cell(nbr[0], nbr[1], screen)
+        while not pq.isEmpty():
+            cur = pq.dequeue()
+            yield EXPANDED, board.coords(cur)
+            if cur == g:
+                yield FOUND, self.refinePath(prevs, g)
+                return
+
+            if cur == s:
+                edges = list(startEdges.items()) + [(j, 1) for j in graph.cross.get(s, [])]
+            else:
+                edges = graph.neighbours(cur)
+                if cur in goalEdges:
+                    edges = edges + [(g, goalEdges[cur])]
+            for nbr, cost in edges:
+                cost2nbr = costs[cur] + cost
+                if nbr not in costs or cost2nbr < costs[nbr]:
+                    costs[nbr] = cost2nbr
+                    prevs[nbr] = cur
+                    x, y = board.coords(nbr)
+                    pq.enqueue(nbr, self.getPriority(cost2nbr, x, y, goal))
+                    yield FRONTIER, (x, y)
+        yield FOUND, []
+
+    def refinePath(self, prevs, g):
+        '''Expands the abstract path ending at g into a full path of cells'''
+        nodes = [g]
+        while prevs[nodes[-1]] is not None:
+            nodes.append(prevs[nodes[-1]])
+        nodes.reverse()
+        path = nodes[:1]
+        for k in range(1, len(nodes)):
+            path += self.graph.refine(nodes[k-1], nodes[k])[1:]
+        return [self.board.coords(i) for i in path]
+
+class BFS(Dijkstra):
+    suboptimality = math.inf # Shortest in steps, but blind to turn costs
+    corridorSearch = False
+    turnBlind = True
+
+    def __init__(self, board, mode_c, mode_h, engine = None, **options):
+        '''Breadth-first search from goal over the whole board, with the
+        path read off goal's DistanceField from start.
+        Both cost modes give every step a cost of 1 and the field ignores
+        turns, so paths are shortest in steps; pathCost still counts their
+        turn costs. The field is kept for further queries to the same goal
+        until the walls change. With stats there is no open list to count:
+        expanded is the number of cells the field settled, 0 if it was
+        reused, and the other counters stay None.
+        engine: DistanceField engine, 'numpy' for the vectorised wavefront,
+                'python' for the per-cell search, or None for numpy when it
+                is installed
+        '''
+        super().__init__(board, mode_c, mode_h, **options)
+        self.engine = select_engine(engine)
+        self.field = None # DistanceField of the last goal
+        self.settled = 0 # Cells settled building the field for the last query
+
+    def getField(self, goal):
+        '''Returns distance field of goal, reusing the last one if it matches
+        and the walls have not changed since it was built
+        '''
+        if self.field is None or self.field.goal != goal:
+            self.field = DistanceField(self.board, goal, self.engine)
+        if self.field.isValid():
+            self.settled = 0
+        else:
+            self.field.build()
+            self.settled = self.field.reached()
+        return self.field
+
+    def makeResult(self, path, elapsed = None):
+        '''Wraps path in a SearchResult, counting settled cells as expanded'''
+        result = super().makeResult(path, elapsed)
+        if self.stats:
+            result.expanded = self.settled
+            result.pushes = result.stalePops = result.peakOpen = None
+        return result
+
+    def findPath(self, start, goal):
+        '''Finds path from start to goal by descending goal's distance field
+        start: (x, y) tuple
+        goal: (x, y) tuple
+        '''
+        return self.getField(goal).path(start)
 
-                    # Relax costs
-                    costs_g[nbr] = cost2nbr
-                    prevs_g[nbr] = cur
-                    pq_g.enqueue(nbr, heuristic) # Multiple nodes possible!
-
-            if screen:
-                self.board.draw_start(screen)
-                self.board.draw_goal(screen)
-                screen.refresh()
-                time.sleep(0.001) # Slow down animation
-
-        # Recreate path
-        path = []
-        if foundPath:
-            path = [cur]
-            i, j = cur
-            while prevs_s[(i, j)]:
-                prev = prevs_s[(i, j)]
-                path.append(prev)
-                i, j = prev
-            path = list(reversed(path))
-
-            i, j = cur
-            while prevs_g[(i, j)]:
-                prev = prevs_g[(i, j)]
-                path.append(prev)
-                i, j = prev
-            return path
-        return path
+    def findSteps(self, start, goal):
+        '''Generator version of search, yielding every cell nearer goal than
+        start in order of distance once the field is built
+        '''
+        field = self.getField(goal)
+        cost = field.cost(start)
+        if cost < math.inf:
+            for node in field.within(cost):
+                yield EXPANDED, node
+        yield FOUND, field.path(start)
@@ -0,0 +1,171 @@
+from multiprocessing import Process, Queue
+from objects.PathPlanners import Dijkstra, AStar, Greedy, DijkstraBD, AStarBD, NBAStar, JPS
+import math
+import queue
+import time
+
+
+# (planner class, mode_h, extra planner arguments). The first four are exact;
+# the rest declare no guarantee (suboptimality inf, JPS included as it ignores
+# turns), so their paths qualify only when provably within the bound
+CONFIGS = [(Dijkstra, 0, {'indexed': True}),
+           (AStar, 0, {'indexed': True}),
+           (AStar, 2, {'indexed': True}),
+           (NBAStar, 0, {}),
+           (Greedy, 0, {'indexed': True}),
+           (DijkstraBD, 0, {'indexed': True}),
+           (AStarBD, 0, {'indexed': True}),
+           (JPS, 0, {})]
+
+
+def race_one(k, board, planner, mode_c, mode_h, options, start, goal, results):
+    '''Runs configuration k of a race and reports (k, path, seconds taken)'''
+    search = planner(board, mode_c, mode_h, **options)
+    started = time.perf_counter()
+    path = list(search.search(start, goal))
+    results.put((k, path, time.perf_counter() - started))
+
+
+class Portfolio:
+    def __init__(self, configs = None, mode_c = 0, bound = 1):
+        '''Races planner configurations against each other in worker
+        processes and takes the first path good enough, stopping the rest.
+        Which configuration wins is recorded per board layout, and later
+        queries on that layout go straight to the usual winner, in-process,
+        for as long as its paths keep meeting the bound.
+        A path meets bound if its planner's suboptimality is within bound,
+        or if its cost is provably within bound of the cheapest: at most
+        bound times the Manhattan distance plus one turn, if it must turn.
+        configs: list of (planner class, mode_h, options), see CONFIGS
+        mode_c: 0 - Manhattan, 1 - Euclidean, for every configuration
+        bound: default guarantee, as the most a path may cost as a multiple
+               of the cheapest; 1 asks for exact planners, inf for any path
+        '''
+        self.configs = list(configs) if configs is not None else list(CONFIGS)
+        self.mode_c = mode_c
+        self.bound = bound
+        self.wins = {} # (board id, layout, bound): {config index: wins}
+        self.last = None # Config index that answered the last query
+
+    def name(self, k):
+        '''Returns readable name of configuration k'''
+        planner, mode_h, options = self.configs[k]
+        name = '{}/h{}'.format(planner.__name__, mode_h)
+        for key, value in sorted(options.items()):
+            name += ' {}={}'.format(key, getattr(value, '__name__', value))
+        return name
+
+    def key(self, board, bound):
+        return (id(board), board.layout, bound)
+
+    def route(self, board, bound):
+        '''Returns index of the configuration that has won most races on
+        board's layout for bound, None if there have been none
+        '''
+        wins = self.wins.get(self.key(board, bound))
+        if not wins:
+            return None
+        return max(wins, key = wins.get)
+
+    def forget(self, board = None):
+        '''Drops recorded winners for board, or for every board'''
+        if board is None:
+            self.wins = {}
+        else:
+            for key in [key for key in self.wins if key[0] == id(board)]:
+                del self.wins[key]
+
+    def meets(self, k, path, cost, bound):
+        '''Returns TRUE if path of configuration k is within bound'''
+        if not path:
+            return False
+        if self.configs[k][0].suboptimality <= bound:
+            return True
+        (x1, y1), (x2, y2) = path[0], path[-1]
+        lower = abs(x1 - x2) + abs(y1 - y2)
+        if x1 != x2 and y1 != y2:
+            lower += Dijkstra.turnCost
+        return cost <= bound * lower + 1e-9
+
+    def pathCost(self, board, path):
+        '''Cost of path under the shared cost model, turn costs included'''
+        if not path:
+            return math.inf
+        return Dijkstra(board, self.mode_c, 0).pathCost(path)
+
+    def plan(self, board, start, goal, bound = None):
+        '''Plans one query, with the recorded winner for board if any,
+        otherwise by racing every configuration
+        board: Board object
+        start: (x, y) tuple
+        goal: (x, y) tuple
+        bound: guarantee for this query, defaults to the portfolio's
+        Returns (path, cost), with ([], inf) if no path exists
+        '''
+        if bound is None:
+            bound = self.bound
+        if not board.connected(start, goal):
+            self.last = None
+            return [], math.inf
+
+        k = self.route(board, bound)
+        if k is not None:
+            planner, mode_h, options = self.configs[k]
+            path = list(planner(board, self.mode_c, mode_h, **options).search(start, goal))
+            cost = self.pathCost(board, path)
+            if self.meets(k, path, cost, bound):
+                self.last = k
+                return path, cost
+        return self.race(board, start, goal, bound)
+
+    def race(self, board, start, goal, bound = None):
+        '''Runs every configuration at once, each in its own process over
+        the same snapshot of board, and returns the first path meeting
+        bound, terminating the other processes. If none meets it, the
+        cheapest path found is returned and no winner is recorded.
+        Returns (path, cost)
+        '''
+        if bound is None:
+            bound = self.bound
+        snapshot = board.snapshot()
+        results = Queue()
+        workers = [Process(target = race_one,
+                           args = (k, snapshot, planner, self.mode_c, mode_h, options,
+                                   start, goal, results),
+                           daemon = True)
+                   for k, (planner, mode_h, options) in enumerate(self.configs)]
+        for worker in workers:
+            worker.start()
+
+        best = ([], math.inf, None)
+        winner = None
+        pending = len(workers)
+        try:
+            while pending:
+                try:
+                    k, path, _ = results.get(timeout = 0.05)
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers) and results.empty():
+                        break # Remaining workers died without reporting
+                    continue
+                pending -= 1
+                cost = self.pathCost(snapshot, path)
+                if self.meets(k, path, cost, bound):
+                    winner = k
+                    best = (path, cost, k)
+                    break
+                if cost < best[1]:
+                    best = (path, cost, k)
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+            for worker in workers:
+                worker.join()
+            results.close()
+
+        if winner is not None:
+            wins = self.wins.setdefault(self.key(board, bound), {})
+            wins[winner] = wins.get(winner, 0) + 1
+        self.last = best[2]
+        return best[0], best[1]
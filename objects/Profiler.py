@@ -0,0 +1,170 @@
+import os
+import time
+
+ENV_VAR = 'PATHPLANNING_PROFILE'
+EXTRAS = ('cprofile', 'tracemalloc')
+PHASES = ['search', 'render', 'sleep', 'input']
+
+
+class Phase:
+    '''Context manager adding its wall time to one profiler total'''
+    __slots__ = ('total', 't')
+
+    def __init__(self, total):
+        self.total = total # [calls, seconds], shared with the profiler
+
+    def __enter__(self):
+        self.t = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.total[0] += 1
+        self.total[1] += time.perf_counter() - self.t
+
+
+class NullPhase:
+    '''Context manager that does nothing, for when profiling is off'''
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+NULL_PHASE = NullPhase()
+
+
+class Profiler:
+    def __init__(self, enabled = False, cprofile = False, tracemalloc = False, top = 10):
+        '''Splits session wall time into search, render, sleep and input
+        phases, optionally with cProfile and tracemalloc on top.
+        A disabled profiler hands out a do-nothing phase and leaves search
+        event streams untouched, so the game pays almost nothing for it.
+        enabled: whether to time anything at all
+        cprofile: whether to run cProfile over the session
+        tracemalloc: whether to trace allocations over the session
+        top: number of functions and allocation sites to report
+        '''
+        self.enabled = enabled
+        self.cprofile = cprofile and enabled
+        self.tracemalloc = tracemalloc and enabled
+        self.top = top
+        self.totals = {name: [0, 0.0] for name in PHASES}
+        self.phases = {name: Phase(total) for name, total in self.totals.items()}
+        self.profile = None
+        self.snapshot = None
+        self.began = None
+        self.elapsed = 0.0
+
+    @classmethod
+    def fromSpec(cls, spec):
+        '''Returns profiler configured by spec, a comma separated list of
+        extras ('cprofile', 'tracemalloc' or 'all'); any other non-empty
+        value, eg. '1', turns on the phase timers alone
+        '''
+        if not spec or spec == '0':
+            return cls()
+        extras = {part.strip().lower() for part in spec.split(',')}
+        if 'all' in extras:
+            extras.update(EXTRAS)
+        return cls(True, 'cprofile' in extras, 'tracemalloc' in extras)
+
+    @classmethod
+    def fromEnv(cls):
+        '''Returns profiler configured by the PATHPLANNING_PROFILE variable'''
+        return cls.fromSpec(os.environ.get(ENV_VAR, ''))
+
+    def phase(self, name):
+        '''Returns context manager timing one run of phase name'''
+        if not self.enabled:
+            return NULL_PHASE
+        return self.phases[name]
+
+    def timed(self, name, events):
+        '''Yields from events, timing each step of the generator as phase
+        name, so work done by the consumer between steps is not counted
+        '''
+        if not self.enabled:
+            return events
+        return self.timeEvents(self.totals[name], events)
+
+    def timeEvents(self, total, events):
+        clock = time.perf_counter
+        events = iter(events)
+        while True:
+            t = clock()
+            try:
+                event = next(events)
+            except StopIteration:
+                total[1] += clock() - t
+                return
+            total[0] += 1
+            total[1] += clock() - t
+            yield event
+
+    def start(self):
+        '''Starts the session clock and any extras'''
+        if not self.enabled:
+            return
+        if self.tracemalloc:
+            import tracemalloc
+            tracemalloc.start(5)
+        if self.cprofile:
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.began = time.perf_counter()
+
+    def stop(self):
+        '''Stops the session clock and any extras'''
+        if not self.enabled or self.began is None:
+            return
+        self.elapsed += time.perf_counter() - self.began
+        self.began = None
+        if self.profile is not None:
+            self.profile.disable()
+        if self.tracemalloc:
+            import tracemalloc
+            self.snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def report(self):
+        '''Returns breakdown of the session as text, empty when disabled'''
+        if not self.enabled:
+            return ''
+        lines = ['Session {:.3f}s'.format(self.elapsed)]
+        lines.append('{:<8}{:>10}{:>12}{:>8}'.format('Phase', 'Calls', 'Time (s)', 'Share'))
+        accounted = 0.0
+        for name in PHASES:
+            calls, seconds = self.totals[name]
+            accounted += seconds
+            lines.append(self.phaseLine(name, calls, seconds))
+        lines.append(self.phaseLine('other', '', max(self.elapsed - accounted, 0.0)))
+
+        if self.profile is not None:
+            import io
+            import pstats
+            stream = io.StringIO()
+            stats = pstats.Stats(self.profile, stream = stream)
+            stats.sort_stats('cumulative').print_stats(self.top)
+            lines.append('')
+            lines.append(stream.getvalue().strip())
+
+        if self.snapshot is not None:
+            import cProfile
+            import profile
+            import tracemalloc
+            # Leave out the profilers' own bookkeeping and module imports
+            snapshot = self.snapshot.filter_traces([
+                tracemalloc.Filter(False, module.__file__)
+                for module in (cProfile, profile, tracemalloc)
+            ] + [tracemalloc.Filter(False, '<frozen importlib*')])
+            lines.append('')
+            lines.append('Top {} allocation sites'.format(self.top))
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                frame = stat.traceback[0]
+                lines.append('{:>10.1f} KiB {:>8} blocks  {}:{}'.format(
+                    stat.size / 1024, stat.count, frame.filename, frame.lineno))
+        return '\n'.join(lines)
+
+    def phaseLine(self, name, calls, seconds):
+        share = seconds / self.elapsed * 100 if self.elapsed else 0.0
+        return '{:<8}{:>10}{:>12.4f}{:>7.1f}%'.format(name, calls, seconds, share)
@@ -0,0 +1,73 @@
+import curses
+
+PAD_SCALE = 3 # Pad spans this many viewports each way, when the board is bigger
+MARGIN = 2 # Cells kept between a followed cell and the viewport edge
+
+
+class Viewport:
+    def __init__(self, board, y, x, height, width):
+        '''Camera onto a board too big to fit on screen.
+        Cells are drawn into a curses pad covering a region of the board
+        around the camera, and the camera's window of the pad is copied to
+        the screen, so scrolling within the region is only a pad refresh.
+        The region is redrawn around the camera once it leaves it.
+        board: Board object
+        y, x: screen position of the viewport's top left corner
+        height, width: most board cells to show; the viewport shrinks to
+                       fit smaller boards
+        '''
+        self.board = board
+        self.y = y
+        self.x = x
+        self.height = min(height, board.l)
+        self.width = min(width, board.w)
+
+        # Camera: top left board cell on screen
+        self.cy = 0
+        self.cx = 0
+
+        # Pad region: top left board cell in the pad and size in cells
+        self.top = 0
+        self.left = 0
+        self.rows = min(board.l, self.height * PAD_SCALE)
+        self.cols = min(board.w, self.width * PAD_SCALE)
+        # Spare row and column, as curses cannot write the last pad cell
+        self.pad = curses.newpad(self.rows + 1, self.cols * 2 + 1)
+
+    def follow(self, x, y):
+        '''Moves the camera so cell (x, y) is on screen, centring on it
+        when it comes within MARGIN cells of the edge
+        '''
+        margin_y = min(MARGIN, (self.height - 1) // 2)
+        margin_x = min(MARGIN, (self.width - 1) // 2)
+        if not self.cy + margin_y <= y < self.cy + self.height - margin_y:
+            self.cy = y - self.height // 2
+        if not self.cx + margin_x <= x < self.cx + self.width - margin_x:
+            self.cx = x - self.width // 2
+        self.cy = max(0, min(self.cy, self.board.l - self.height))
+        self.cx = max(0, min(self.cx, self.board.w - self.width))
+
+        # Recentre the pad region once the camera leaves it
+        if (not self.top <= self.cy <= self.top + self.rows - self.height or
+                not self.left <= self.cx <= self.left + self.cols - self.width):
+            top = self.cy - (self.rows - self.height) // 2
+            left = self.cx - (self.cols - self.width) // 2
+            self.top = max(0, min(top, self.board.l - self.rows))
+            self.left = max(0, min(left, self.board.w - self.cols))
+            self.pad.erase()
+            self.board.dirtyAll = True
+
+    def draw(self, cursor = False):
+        '''Draws changed cells into the pad, and the cursor if asked,
+        then shows the camera's window on screen
+        '''
+        self.board.draw(self.pad, self)
+        if cursor:
+            self.board.draw_cursor(self.pad, self)
+        self.refresh()
+
+    def refresh(self):
+        '''Copies the camera's window of the pad to the screen'''
+        self.pad.refresh(self.cy - self.top, (self.cx - self.left) * 2,
+                         self.y, self.x,
+                         self.y + self.height - 1, self.x + self.width * 2 - 1)